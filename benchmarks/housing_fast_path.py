@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Compares the housing fast path (the extracted sklearn pipeline called on a
+# preallocated frame) with PyCaret's predict_model, for single rows and for
+# batches, and checks that both return the same predictions.
+#
+#   python benchmarks/housing_fast_path.py --rows 500 --batch 1000
+#
+# Needs pycaret and artifacts/best_pycaret_model.pkl.
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+SUBURBS = ["Abbotsford", "Brunswick", "Richmond", "Carlton", "Footscray"]
+TYPES = ["h", "u", "t"]
+
+def sample_row(rng, expected_columns):
+    row = {
+        "Suburb": rng.choice(SUBURBS), "Rooms": rng.randint(1, 6), "Type": rng.choice(TYPES),
+        "Distance": round(rng.uniform(1, 30), 1), "Landsize": rng.randint(0, 1000),
+        "BuildingArea": rng.randint(40, 300), "YearBuilt": rng.randint(1900, 2020),
+        "Bathroom": rng.randint(1, 3), "Car": rng.randint(0, 3),
+        "Latitude": -37.8 + rng.uniform(-0.1, 0.1), "Longitude": 145.0 + rng.uniform(-0.1, 0.1)
+    }
+    return {col: row[col] for col in expected_columns if col in row}
+
+def time_calls(fn, payloads):
+    latencies = []
+    results = []
+    for payload in payloads:
+        started = time.perf_counter()
+        results.append(fn(payload))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, results
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * (len(latencies) - 1)))]
+    print(f"{label:<28}{statistics.median(latencies):>10.3f}{p95:>10.3f}{statistics.mean(latencies):>10.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Housing fast path vs PyCaret predict_model")
+    parser.add_argument("--rows", type=int, default=500, help="single-row calls per path")
+    parser.add_argument("--batch", type=int, default=1000, help="rows in the batch call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    import app
+    from model_registry import registry
+
+    model = registry.get("housing")
+    if model is None:
+        sys.exit("Housing model could not be loaded")
+    scorer = app.get_scorer(model)
+    if scorer.pipeline is None:
+        sys.exit("No sklearn pipeline found in the loaded model; the fast path would use predict_model")
+
+    rng = random.Random(args.seed)
+    rows = [app.HOUSING_SCHEMA.validate(sample_row(rng, app.expected_columns)) for _ in range(args.rows)]
+    batch = [app.HOUSING_SCHEMA.validate(sample_row(rng, app.expected_columns)) for _ in range(args.batch)]
+
+    # Untimed warm-up for both paths
+    scorer.predict(rows[:1])
+    scorer.predict_model(rows[:1])
+
+    print(f"{'path':<28}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    slow, slow_results = time_calls(lambda row: scorer.predict_model([row]), rows)
+    fast, fast_results = time_calls(lambda row: scorer.predict([row]), rows)
+    report("predict_model (1 row)", slow)
+    report("fast path (1 row)", fast)
+
+    slow_batch, (slow_batch_result,) = time_calls(scorer.predict_model, [batch])
+    fast_batch, (fast_batch_result,) = time_calls(scorer.predict, [batch])
+    report(f"predict_model ({args.batch} rows)", slow_batch)
+    report(f"fast path ({args.batch} rows)", fast_batch)
+
+    print(f"\nSingle-row speedup: {statistics.median(slow) / statistics.median(fast):.1f}x, "
+          f"batch speedup: {slow_batch[0] / fast_batch[0]:.1f}x")
+
+    mismatches = sum(a != b for a, b in zip(slow_results, fast_results))
+    mismatches += sum(a != b for a, b in zip(slow_batch_result, fast_batch_result))
+    if mismatches:
+        print(f"{mismatches} predictions differ between the two paths")
+        sys.exit(1)
+    print("Predictions are identical")
+
+if __name__ == "__main__":
+    main()
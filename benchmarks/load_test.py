@@ -0,0 +1,283 @@
+import argparse
+import http.client
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+# Load test for the prediction routes. Drives each route either in-process
+# through Flask's test client or over HTTP against a locally started gunicorn,
+# and reports p50/p95/p99 latency, requests per second and peak RSS.
+#
+#   python benchmarks/load_test.py --mode client --requests 2000 --concurrency 8
+#   python benchmarks/load_test.py --mode gunicorn --save-baseline benchmarks/baseline.json
+#   python benchmarks/load_test.py --mode gunicorn --compare benchmarks/baseline.json
+#
+# --compare exits with status 1 when a route's p95 or throughput regressed by
+# more than --tolerance percent.
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+
+# Payloads use the example values from the HTML forms. The numeric fields are
+# varied per request so the prediction cache doesn't turn the run into a
+# cache benchmark (pass --repeat to send identical payloads instead).
+def wheat_form(i):
+    return {
+        "area": 14.8 + (i % 50) * 0.01, "perimeter": 14.6, "compactness": 0.87,
+        "length": 5.6, "width": 3.26, "asymmetry_coeff": 3.7, "groove": 5.4
+    }
+
+def car_form(i):
+    return {
+        "brand_model": "Maruti Swift Dzire VDI", "location": "Mumbai", "year": 2018,
+        "kilometers_driven": 45000 + i, "fuel_type": "Petrol", "transmission": "Manual",
+        "owner_type": "First", "mileage": 21.5, "engine": 1197, "power": 74.0, "seats": 5
+    }
+
+def housing_json(i):
+    return {"Rooms": 3, "Distance": 5.2 + (i % 50) * 0.1, "Landsize": 450,
+            "BuildingArea": 120, "YearBuilt": 1990}
+
+# name -> (app, path, encoding, payload)
+ROUTES = {
+    "wheat_process": ("main", "/wheat/process", "form", wheat_form),
+    "car_predict": ("main", "/car/predict", "form", car_form),
+    "predict_car": ("main", "/predict", "form", car_form),
+    "predict_wheat": ("main", "/predict", "form", wheat_form),
+    "process": ("main", "/process", "form", wheat_form),
+    "housing_predict": ("housing", "/predict", "json", housing_json),
+}
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(latencies, elapsed, errors, peak_rss_kb):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "peak_rss_mb": peak_rss_kb / 1024.0 if peak_rss_kb else None
+    }
+
+def run_load(send, total, concurrency, repeat):
+    # send(i) performs one request and returns True on success
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        local = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            ok = send(0 if repeat else i)
+            local.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return latencies, time.perf_counter() - started, errors[0]
+
+# ---- in-process mode -------------------------------------------------------
+
+def load_flask_apps():
+    sys.path.insert(0, SRC_DIR)
+    import main
+    apps = {"main": main.main_app}
+    try:
+        import app as housing
+        apps["housing"] = housing.app
+    except Exception as e:
+        print(f"Housing app unavailable: {e}")
+    return apps
+
+def client_sender(flask_app, path, encoding, payload):
+    local = threading.local()
+
+    def send(i):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = flask_app.test_client()
+        if encoding == "json":
+            response = client.post(path, json=payload(i))
+        else:
+            response = client.post(path, data=payload(i))
+        return response.status_code == 200 and b'"error"' not in response.data
+    return send
+
+# ---- gunicorn mode ---------------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_gunicorn(app_name, workers):
+    port = free_port()
+    if app_name == "main":
+        command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(SRC_DIR, "gunicorn.conf.py")]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "--chdir", SRC_DIR, "app:app"]
+    command += ["--bind", f"127.0.0.1:{port}", "--workers", str(workers)]
+    process = subprocess.Popen(command, cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn for {app_name} exited with {process.returncode}")
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"gunicorn for {app_name} did not start")
+
+def process_tree_peak_rss_kb(pid):
+    # Sum of VmHWM (peak resident set) over the master and its workers (Linux only)
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        return None
+    total = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total
+
+def http_sender(port, path, encoding, payload):
+    local = threading.local()
+
+    def send(i):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        if encoding == "json":
+            body, content_type = json.dumps(payload(i)), "application/json"
+        else:
+            body, content_type = urllib.parse.urlencode(payload(i)), "application/x-www-form-urlencoded"
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            local.conn = None
+            return False
+        return response.status == 200 and b'"error"' not in data
+    return send
+
+# ---- reporting -------------------------------------------------------------
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"\n{'route':<18}{'p95 ms':>10}{'base':>10}{'change':>9}{'rps':>10}{'base':>10}{'change':>9}")
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b:
+            continue
+        p95_change = (r["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 if b["p95_ms"] else 0.0
+        rps_change = (r["rps"] - b["rps"]) / b["rps"] * 100 if b["rps"] else 0.0
+        flag = ""
+        if p95_change > tolerance or rps_change < -tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<18}{r['p95_ms']:>10.2f}{b['p95_ms']:>10.2f}{p95_change:>8.1f}%"
+              f"{r['rps']:>10.1f}{b['rps']:>10.1f}{rps_change:>8.1f}%{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and throughput benchmark for the prediction routes")
+    parser.add_argument("--mode", choices=["client", "gunicorn"], default="client")
+    parser.add_argument("--routes", nargs="*", default=list(ROUTES), choices=list(ROUTES))
+    parser.add_argument("--requests", type=int, default=1000, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per route")
+    parser.add_argument("--repeat", action="store_true", help="send identical payloads")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    results = {}
+    servers = {}
+    apps = load_flask_apps() if args.mode == "client" else None
+    try:
+        for name in args.routes:
+            app_name, path, encoding, payload = ROUTES[name]
+            if args.mode == "client":
+                if app_name not in apps:
+                    continue
+                send = client_sender(apps[app_name], path, encoding, payload)
+            else:
+                if app_name not in servers:
+                    servers[app_name] = start_gunicorn(app_name, args.workers)
+                send = http_sender(servers[app_name][1], path, encoding, payload)
+
+            run_load(send, args.warmup, 1, args.repeat)
+            latencies, elapsed, errors = run_load(send, args.requests, args.concurrency, args.repeat)
+
+            if args.mode == "client":
+                peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            else:
+                peak = process_tree_peak_rss_kb(servers[app_name][0].pid)
+            results[name] = summarize(latencies, elapsed, errors, peak)
+    finally:
+        for process, _ in servers.values():
+            process.terminate()
+            process.wait()
+
+    print(f"{'route':<18}{'reqs':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}{'peak RSS MB':>13}")
+    for name, r in results.items():
+        rss = f"{r['peak_rss_mb']:.1f}" if r["peak_rss_mb"] else "-"
+        print(f"{name:<18}{r['requests']:>7}{r['errors']:>8}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+              f"{r['p99_ms']:>9.2f}{r['rps']:>10.1f}{rss:>13}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"mode": args.mode, "routes": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("mode") != args.mode:
+            print(f"\nWarning: baseline was recorded in {baseline.get('mode')} mode")
+        regressions = compare(results, baseline["routes"], args.tolerance)
+        if regressions:
+            print(f"\nRegressed routes: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
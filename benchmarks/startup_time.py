@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Measures the time from process start to the first served request, for each
+# page that should come up without the ML stack, and reports which heavy
+# modules were imported by then.
+#
+#   python benchmarks/startup_time.py --runs 5
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+HEAVY_MODULES = ["pandas", "sklearn", "joblib", "pycaret"]
+PATHS = ["/", "/wheat", "/car", "/debug"]
+
+# Runs in a fresh interpreter: import the app, serve one request, report
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+response = main.main_app.test_client().get({path!r})
+served = time.perf_counter()
+print(json.dumps({{
+    "status": response.status_code,
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+def run_once(path):
+    code = CHILD.format(src=SRC_DIR, path=path, heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    # The structured log writes to stdout by default; keep it out of the result
+    env = dict(os.environ, LOG_FILE=os.devnull)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                            text=True, check=True, cwd=SRC_DIR, env=env).stdout
+    total_ms = (time.perf_counter() - started) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = total_ms
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Process start to first served request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    report = {}
+    for path in PATHS:
+        runs = [run_once(path) for _ in range(args.runs)]
+        report[path] = {
+            "status": runs[-1]["status"],
+            "process_ms": statistics.median(r["process_ms"] for r in runs),
+            "import_ms": statistics.median(r["import_ms"] for r in runs),
+            "first_request_ms": statistics.median(r["first_request_ms"] for r in runs),
+            "heavy_modules": runs[-1]["heavy_modules"]
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'path':<10}{'status':>8}{'process ms':>12}{'import ms':>12}{'request ms':>12}  heavy modules")
+    for path, r in report.items():
+        heavy = ", ".join(r["heavy_modules"]) or "-"
+        print(f"{path:<10}{r['status']:>8}{r['process_ms']:>12.1f}{r['import_ms']:>12.1f}"
+              f"{r['first_request_ms']:>12.1f}  {heavy}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+# Builds artifacts/car_vocabulary.json from the car model's training data:
+# every value of each categorical column, most common first. /car/suggest
+# ranks its suggestions in this order, and the encoders learn every value in
+# it. Run it whenever the car model is retrained:
+#
+#   python scripts/build_car_vocabulary.py training_data.csv
+#
+# The CSV needs the model's column names (Brand_Model, Location, Fuel_Type,
+# Transmission, Owner_Type).
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+def build(csv_path, chunksize=100_000):
+    import pandas as pd
+    from roanne_carapp import categorical_columns
+
+    counts = {col: Counter() for col in categorical_columns}
+    for chunk in pd.read_csv(csv_path, usecols=categorical_columns, dtype=str, chunksize=chunksize):
+        for col in categorical_columns:
+            counts[col].update(chunk[col].dropna().str.strip())
+    # Ties keep alphabetical order so the file is stable between runs
+    return {col: [value for value, _ in sorted(counter.items(), key=lambda item: (-item[1], item[0])) if value]
+            for col, counter in counts.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Build car_vocabulary.json from training data")
+    parser.add_argument("csv", help="training data with the model's column names")
+    parser.add_argument("--out", default=os.path.join(ROOT, "artifacts", "car_vocabulary.json"))
+    args = parser.parse_args()
+
+    vocabulary = build(args.csv)
+    with open(args.out, "w") as f:
+        json.dump(vocabulary, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    for col, values in vocabulary.items():
+        print(f"{col}: {len(values)} values")
+    print(f"wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,29 @@
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
-from pycaret.regression import load_model, predict_model
+from flask import Flask, render_template, request, jsonify, Response
 import os
+import threading
+import time
+from model_registry import registry
+from artifact_package import is_package, load_package
+from prediction_cache import prediction_cache, canonical_key
+from metrics import metrics, stage_seconds, predictions_total, CONTENT_TYPE
+from schema import Schema, Field, ValidationError
+from responses import Envelope
+from structured_log import log
+from single_flight import SingleFlight
 
 app = Flask(__name__)
 
-# Path to artifacts folder
-ARTIFACTS_PATH = os.path.join(os.path.dirname(__file__), '../artifacts', 'best_pycaret_model')
+# Load the trained model from the artifacts folder on first use.
+# pycaret takes seconds to import, so it is only imported here.
+def load_pycaret_model(path):
+    if is_package(path):
+        return load_package(path)
+    from pycaret.regression import load_model
+    # PyCaret's load_model takes the path without the .pkl extension
+    return load_model(os.path.splitext(path)[0])
 
-# Load the trained model
-model = load_model(ARTIFACTS_PATH)  # ✅ Access from artifacts folder
+registry.register('housing', ['best_pycaret_model.pkg', 'best_pycaret_model.pkl'],
+                  loader=load_pycaret_model)
 
 # Expected columns based on PyCaret training
 expected_columns = ['Suburb', 'Address', 'Rooms', 'Type', 'Method', 'Seller', 'Date', 
@@ -17,41 +31,179 @@ expected_columns = ['Suburb', 'Address', 'Rooms', 'Type', 'Method', 'Seller', 'D
                     'BuildingArea', 'YearBuilt', 'CouncilArea', 'Latitude', 'Longitude', 
                     'Region', 'Propertycount']
 
+# Numeric columns; anything that isn't a number becomes 0
+numeric_columns = ['Rooms', 'Distance', 'Postcode', 'Bedroom2', 'Bathroom', 'Car',
+                   'Landsize', 'BuildingArea', 'YearBuilt', 'Latitude', 'Longitude', 
+                   'Propertycount']
+
+# Missing text columns become "Unknown", missing numeric columns 0
+HOUSING_SCHEMA = Schema([
+    Field(col, float, default=0, lenient=True) if col in numeric_columns
+    else Field(col, str, default="Unknown")
+    for col in expected_columns
+])
+
+# Fast scoring path. predict_model() re-runs PyCaret's setup checks, copies the
+# input frame and returns every input column next to the Label. The object
+# load_model() returns is the fitted sklearn Pipeline itself (preprocessing
+# steps plus the final estimator), so its predict() gives the same numbers.
+# predict_model rounds its label to 4 decimals, so the fast path does too.
+# Set HOUSING_FAST_PATH=0 to always go through predict_model.
+FAST_PATH = os.environ.get('HOUSING_FAST_PATH', '1') != '0'
+LABEL_DECIMALS = 4
+
+def extract_pipeline(model):
+    # load_model returns PyCaret's Pipeline (an sklearn Pipeline subclass);
+    # some wrappers keep it under .pipeline
+    for candidate in (model, getattr(model, 'pipeline', None)):
+        if candidate is not None and hasattr(candidate, 'steps') and hasattr(candidate, 'predict'):
+            return candidate
+    return None
+
+class HousingScorer:
+    def __init__(self, model):
+        import pandas as pd
+        self.model = model
+        self.pipeline = extract_pipeline(model)
+        self._local = threading.local()
+        # Column dtypes match what the schema produces, so the pipeline's
+        # dtype inference sees the same frame predict_model would build
+        self._template = pd.DataFrame({
+            col: pd.Series([0.0], dtype='float64') if col in numeric_columns
+            else pd.Series(['Unknown'], dtype='object')
+            for col in expected_columns
+        })
+
+    def _row_frame(self):
+        # One preallocated single-row frame per thread, overwritten in place
+        frame = getattr(self._local, 'frame', None)
+        if frame is None:
+            frame = self._local.frame = self._template.copy()
+        return frame
+
+    def frame(self, rows):
+        import pandas as pd
+        if len(rows) == 1:
+            frame = self._row_frame()
+            row = rows[0]
+            for i, col in enumerate(expected_columns):
+                frame.iat[0, i] = row[col]
+            return frame
+        return pd.DataFrame(rows, columns=expected_columns)
+
+    def predict(self, rows):
+        import numpy as np
+        if self.pipeline is None:
+            return self.predict_model(rows)
+        return np.round(self.pipeline.predict(self.frame(rows)), LABEL_DECIMALS).tolist()
+
+    def predict_model(self, rows):
+        import pandas as pd
+        from pycaret.regression import predict_model
+        prediction = predict_model(self.model, data=pd.DataFrame(rows, columns=expected_columns))
+        # PyCaret 3 names the output column prediction_label, PyCaret 2 Label
+        label = "prediction_label" if "prediction_label" in prediction.columns else "Label"
+        return prediction[label].tolist()
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_scorer(model):
+    # Built once per loaded model; a hot-reloaded model gets a fresh scorer
+    global _scorer
+    scorer = _scorer
+    if scorer is None or scorer.model is not model:
+        with _scorer_lock:
+            scorer = _scorer
+            if scorer is None or scorer.model is not model:
+                scorer = _scorer = HousingScorer(model)
+    return scorer
+
+# {"prediction": [...]}, with everything but the list rendered once
+PREDICTION = Envelope("prediction")
+
+# Metric children resolved once so recording stays cheap
+parse_timer = stage_seconds.labels(model='housing', stage='parse')
+predict_timer = stage_seconds.labels(model='housing', stage='predict')
+total_timer = stage_seconds.labels(model='housing', stage='total')
+outcomes = {outcome: predictions_total.labels(model='housing', outcome=outcome)
+            for outcome in ('model', 'cache_hit', 'error')}
+
+# Collapses identical concurrent requests into one model call
+flight = SingleFlight('housing')
+
 @app.route("/")
 def home():
     return render_template("index.html")
 
+def score_rows(model, rows, cache_key):
+    scorer = get_scorer(model)
+    with predict_timer.time():
+        if FAST_PATH:
+            predicted_price = scorer.predict(rows)
+        else:
+            predicted_price = scorer.predict_model(rows)
+    if cache_key:
+        prediction_cache.put(cache_key, predicted_price)
+    outcomes['model'].inc(len(rows))
+    return predicted_price
+
 @app.route('/predict', methods=['POST'])
 def predict():
+    started = time.perf_counter()
     try:
         data = request.get_json()
         if not data:
             return jsonify({"error": "Invalid JSON data"}), 400
 
-        # Convert input to DataFrame
-        df = pd.DataFrame([data])
-
-        # Add missing columns
-        for col in expected_columns:
-            if col not in df.columns:
-                df[col] = "Unknown" if df[col].dtype == object else 0
-
-        # Convert numeric columns
-        numeric_columns = ['Rooms', 'Distance', 'Postcode', 'Bedroom2', 'Bathroom', 'Car',
-                           'Landsize', 'BuildingArea', 'YearBuilt', 'Latitude', 'Longitude', 
-                           'Propertycount']
-        
-        for col in numeric_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        # Validate and fill every expected column in one pass.
+        # A JSON array scores several houses in one call.
+        try:
+            if isinstance(data, list):
+                rows = HOUSING_SCHEMA.validate_batch(data)
+            else:
+                rows = [HOUSING_SCHEMA.validate(data)]
+        except ValidationError as e:
+            outcomes['error'].inc()
+            return jsonify({"error": str(e), "fields": e.errors}), 400
+        parse_timer.observe(time.perf_counter() - started)
 
         # Make prediction
-        prediction = predict_model(model, data=df)
-        predicted_price = prediction["Label"].tolist()
+        model = registry.get('housing')
+        if model is None:
+            outcomes['error'].inc()
+            return jsonify({"error": "Model not loaded"})
+
+        # Repeated submissions are answered from the cache
+        cache_key = None
+        if len(rows) == 1:
+            cache_key = canonical_key('housing', registry.fingerprint('housing'),
+                                      expected_columns, rows[0])
+        predicted_price = prediction_cache.get(cache_key) if cache_key else None
+        if predicted_price is None:
+            if cache_key:
+                # Identical houses already being scored wait for that result
+                predicted_price, _ = flight.do(cache_key, lambda: score_rows(model, rows, cache_key))
+            else:
+                predicted_price = score_rows(model, rows, None)
+        else:
+            outcomes['cache_hit'].inc()
 
-        return jsonify({"prediction": predicted_price})
+        total_timer.observe(time.perf_counter() - started)
+        return PREDICTION.response(predicted_price)
 
     except Exception as e:
+        log.error("route_error", route="housing_predict", exc=e)
+        outcomes['error'].inc()
         return jsonify({"error": str(e)})
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(prediction_cache.stats())
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,236 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+import sys
+import time
+
+# Packaged model artifacts. A package is a directory next to the plain pickles,
+# e.g. artifacts/used_car_price_model.pkg/, holding
+#
+#   model.pkl      the estimator pickled with protocol 5, numpy arrays left out
+#   arrays.bin     the arrays' raw buffers, uncompressed and 64-byte aligned
+#   manifest.json  feature schema, library versions, buffer offsets and the
+#                  sha256 of both data files
+#
+# Loading reads the manifest first, refuses a package built with a different
+# scikit-learn (or PyCaret) version before anything is unpickled, and checks
+# both files against their recorded hashes. arrays.bin is mmap'd once and the
+# model's arrays are views into it, so they are neither copied on load nor
+# duplicated across gunicorn workers. Tree ensembles hold hundreds of small
+# arrays, which makes this faster than both pickle.load and joblib's
+# one-mmap-per-array loading.
+#
+#   python src/artifact_package.py pack                  # every artifact in artifacts/
+#   python src/artifact_package.py pack artifacts/seed_pipeline.pkl --features A,B,C
+#   python src/artifact_package.py verify artifacts/seed_pipeline.pkg
+
+PACKAGE_SUFFIX = ".pkg"
+MANIFEST = "manifest.json"
+MODEL_FILE = "model.pkl"
+ARRAYS_FILE = "arrays.bin"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Libraries whose version must match between packing and loading
+CHECKED_LIBRARIES = ("sklearn", "pycaret")
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+ARTIFACTS_DIR = os.path.join(os.path.dirname(current_dir), "artifacts")
+
+class ArtifactError(ValueError):
+    pass
+
+def is_package(path):
+    return path.endswith(PACKAGE_SUFFIX) and os.path.isdir(path)
+
+def manifest_path(path):
+    return os.path.join(path, MANIFEST)
+
+def library_versions():
+    # Recorded only for libraries the model actually pulled in when it was
+    # unpickled, so a plain sklearn model doesn't end up requiring PyCaret
+    return {name: getattr(sys.modules[name], "__version__", None)
+            for name in CHECKED_LIBRARIES if name in sys.modules}
+
+def read_manifest(path):
+    try:
+        with open(manifest_path(path)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"{path}: unreadable manifest ({e})")
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ArtifactError(f"{path}: unsupported package format {manifest.get('format')!r}")
+    return manifest
+
+def check_versions(path, manifest):
+    # Only libraries recorded at packing time are checked; comparing versions
+    # is cheap, unpickling against the wrong sklearn is not
+    for name, packed in manifest.get("versions", {}).items():
+        try:
+            module = __import__(name)
+        except ImportError:
+            raise ArtifactError(f"{path}: packed with {name} {packed}, which is not installed")
+        installed = getattr(module, "__version__", None)
+        if installed != packed:
+            raise ArtifactError(f"{path}: packed with {name} {packed}, running {installed}")
+
+def load_package(path, verify=True):
+    manifest = read_manifest(path)
+    check_versions(path, manifest)
+
+    with open(os.path.join(path, manifest["model"]["file"]), "rb") as f:
+        data = f.read()
+    arrays = manifest["arrays"]
+    view = memoryview(b"")
+    if arrays["size"]:
+        with open(os.path.join(path, arrays["file"]), "rb") as f:
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    if verify:
+        for name, content in ((manifest["model"], data), (arrays, view)):
+            if hashlib.sha256(content).hexdigest() != name["sha256"]:
+                raise ArtifactError(f"{path}: {name['file']} does not match its sha256")
+
+    # The arrays are read-only views into the mapping, as with joblib's mmap_mode='r'
+    return pickle.loads(data, buffers=[view[offset:offset + size] for offset, size in arrays["buffers"]])
+
+def feature_schema(model, features=None):
+    # Explicit names win; otherwise what the estimator was fitted on
+    if features:
+        names = list(features)
+    else:
+        names = getattr(model, "feature_names_in_", None)
+        names = [str(n) for n in names] if names is not None else None
+    n_features = len(names) if names else getattr(model, "n_features_in_", None)
+    return {"names": names, "n_features": None if n_features is None else int(n_features)}
+
+def pack(model, out_path, features=None, source=None):
+    # Written to a temporary directory and renamed into place, so a hot-reload
+    # poll never sees half a package
+    buffers = []
+    data = pickle.dumps(model, protocol=5, buffer_callback=buffers.append)
+
+    tmp_path = f"{out_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        with open(os.path.join(tmp_path, MODEL_FILE), "wb") as f:
+            f.write(data)
+
+        offsets = []
+        arrays_digest = hashlib.sha256()
+        with open(os.path.join(tmp_path, ARRAYS_FILE), "wb") as f:
+            position = 0
+            for buffer in buffers:
+                raw = buffer.raw()
+                padding = b"\0" * (-position % ALIGNMENT)
+                for chunk in (padding, raw):
+                    f.write(chunk)
+                    arrays_digest.update(chunk)
+                position += len(padding)
+                offsets.append((position, raw.nbytes))
+                position += raw.nbytes
+
+        manifest = {
+            "format": FORMAT_VERSION,
+            "estimator": f"{type(model).__module__}.{type(model).__name__}",
+            "features": feature_schema(model, features),
+            "versions": library_versions(),
+            "model": {"file": MODEL_FILE, "sha256": hashlib.sha256(data).hexdigest(), "size": len(data)},
+            "arrays": {"file": ARRAYS_FILE, "sha256": arrays_digest.hexdigest(), "size": position,
+                       "buffers": offsets},
+            "source": os.path.basename(source) if source else None,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        }
+        with open(manifest_path(tmp_path), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(out_path):
+            old_path = f"{out_path}.old-{os.getpid()}"
+            os.rename(out_path, old_path)
+            os.rename(tmp_path, out_path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.rename(tmp_path, out_path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return manifest
+
+def load_source(path):
+    if path.endswith(".joblib"):
+        import joblib
+        return joblib.load(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def default_sources(artifacts_dir=ARTIFACTS_DIR):
+    # One source per model name; the joblib copy wins over the pickle
+    sources = {}
+    for filename in sorted(os.listdir(artifacts_dir)):
+        stem, ext = os.path.splitext(filename)
+        if ext == ".joblib" or (ext == ".pkl" and stem not in sources):
+            sources[stem] = os.path.join(artifacts_dir, filename)
+    return list(sources.values())
+
+def package_path_for(source):
+    return os.path.splitext(source)[0] + PACKAGE_SUFFIX
+
+def cmd_pack(args):
+    sources = args.sources or default_sources()
+    if args.features and len(sources) != 1:
+        sys.exit("--features needs exactly one source artifact")
+    features = args.features.split(",") if args.features else None
+    for source in sources:
+        out_path = args.out if args.out and len(sources) == 1 else package_path_for(source)
+        manifest = pack(load_source(source), out_path, features=features, source=source)
+        print(f"Packed {source} -> {out_path} ({manifest['estimator']}, "
+              f"{len(manifest['arrays']['buffers'])} arrays, "
+              f"{manifest['model']['size'] + manifest['arrays']['size']} bytes)")
+
+def cmd_verify(args):
+    failed = False
+    for path in args.packages:
+        try:
+            started = time.perf_counter()
+            load_package(path)
+            load_ms = (time.perf_counter() - started) * 1000
+        except ArtifactError as e:
+            print(f"FAILED {e}")
+            failed = True
+            continue
+
+        line = f"OK {path}: loaded in {load_ms:.1f} ms"
+        source = read_manifest(path).get("source")
+        source_path = os.path.join(os.path.dirname(os.path.abspath(path)), source) if source else None
+        if source_path and os.path.exists(source_path):
+            started = time.perf_counter()
+            load_source(source_path)
+            line += f" (unpickling {source}: {(time.perf_counter() - started) * 1000:.1f} ms)"
+        print(line)
+    if failed:
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Package model artifacts with a manifest and integrity hash")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = commands.add_parser("pack", help="package .pkl/.joblib artifacts")
+    pack_parser.add_argument("sources", nargs="*", help="artifacts to pack (default: all in artifacts/)")
+    pack_parser.add_argument("--out", help="package path (single source only)")
+    pack_parser.add_argument("--features", help="comma-separated feature names for the manifest")
+    pack_parser.set_defaults(run=cmd_pack)
+
+    verify_parser = commands.add_parser("verify", help="check versions and hashes, and time the load")
+    verify_parser.add_argument("packages", nargs="+")
+    verify_parser.set_defaults(run=cmd_verify)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
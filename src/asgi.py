@@ -0,0 +1,192 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Async serving mode. Run from the project root with:
+#   uvicorn asgi:app --app-dir src --host 0.0.0.0 --port 10000
+#
+# Request and response I/O happens on the event loop. The CPU-bound prediction
+# routes are dispatched to a bounded pool of worker processes, each holding its
+# own preloaded copy of the wheat and car models. When more than
+# ASGI_MAX_QUEUE predictions are waiting, new ones get a 503 right away
+# instead of queueing without bound. Every other route (pages, /debug,
+# /metrics, the streaming car batch route) goes to main_app through asgiref's
+# WSGI adapter.
+#
+# Pooled predictions run in the worker processes, so the model-side numbers on
+# /metrics and /cache/stats (per-stage latency, prediction outcomes, cache
+# hits, micro-batching) only cover requests served by this process, not the
+# pool. For the pooled routes the event loop exports its own view instead:
+# asgi_pool_requests_total{path,status}, asgi_pool_request_seconds{path},
+# asgi_pool_pending and asgi_pool_rejected_total.
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from asgiref.wsgi import WsgiToAsgi
+from main import main_app
+from structured_log import log
+from metrics import metrics
+
+POOL_WORKERS = int(os.environ.get("ASGI_POOL_WORKERS", os.cpu_count() or 1))
+MAX_QUEUE = int(os.environ.get("ASGI_MAX_QUEUE", POOL_WORKERS * 8))
+
+# POST routes that run in the process pool
+POOL_ROUTES = {"/wheat/process", "/process", "/car/predict", "/predict", "/wheat/predict_batch"}
+
+# ---- runs inside the pool's worker processes --------------------------------
+
+_worker_app = None
+
+def _init_worker():
+    global _worker_app
+    from main import main_app as worker_app
+    from model_registry import registry
+    from roanne_carapp import get_encoding
+    from native_model import compile_registered
+    import roanne_carapp
+    import wileenAPP
+
+    # A pool worker handles one request at a time, so there is nothing to
+    # micro-batch. The batchers already exist (unpickling this function
+    # imported main), so setting MICRO_BATCH_MAX_SIZE here would be too late.
+    roanne_carapp.batcher.max_batch_size = 1
+    wileenAPP.batcher.max_batch_size = 1
+
+    registry.warm_up()
+    get_encoding()
+    compile_registered(registry)
+    _worker_app = worker_app
+
+def _ready():
+    return os.getpid()
+
+def _dispatch(path, query_string, body, headers):
+    # Runs the normal Flask view with the request's query string and headers
+    # (Accept, Content-Type, ...), so responses are identical to the WSGI app
+    with _worker_app.test_request_context(path, method="POST", query_string=query_string,
+                                          data=body, headers=headers):
+        response = _worker_app.full_dispatch_request()
+        return response.status_code, list(response.headers.items()), response.get_data()
+
+# ---- event loop side -------------------------------------------------------
+
+pool_requests = metrics.counter("asgi_pool_requests_total", "Predictions served by the process pool",
+                                ("path", "status"))
+pool_seconds = metrics.histogram("asgi_pool_request_seconds",
+                                 "Time from reading the body to the pool's answer", ("path",))
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+async def _send_response(send, status, headers, body):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class AsyncPredictionApp:
+    def __init__(self, pool_workers=POOL_WORKERS, max_queue=MAX_QUEUE):
+        self.pool_workers = pool_workers
+        self.max_queue = max_queue
+        self.pool = None
+        self.pending = 0
+        self.rejected = 0
+        self.wsgi = WsgiToAsgi(main_app)
+
+    def start(self):
+        if self.pool is None:
+            # forkserver/spawn: don't fork a process that is running an event loop
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self.pool = ProcessPoolExecutor(max_workers=self.pool_workers, mp_context=context,
+                                            initializer=_init_worker)
+            # Start every worker (and load its models) before taking traffic
+            for future in [self.pool.submit(_ready) for _ in range(self.pool_workers)]:
+                future.result()
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in POOL_ROUTES:
+            await self._predict(scope, receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self.start)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self.stop)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _predict(self, scope, receive, send):
+        # Backpressure: refuse work instead of letting the queue grow
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            body = json.dumps({"error": "Server busy, please retry"}).encode()
+            await _send_response(send, 503, [("Content-Type", "application/json"),
+                                             ("Retry-After", "1")], body)
+            return
+
+        self.pending += 1
+        try:
+            body = await _read_body(receive)
+            if body is None:
+                return
+            started = time.perf_counter()
+            if self.pool is None:
+                await asyncio.get_running_loop().run_in_executor(None, self.start)
+
+            # ASGI hands both over as bytes; the Flask request context wants str
+            query_string = scope.get("query_string", b"").decode("latin-1")
+            headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]]
+            try:
+                status, response_headers, response_body = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, _dispatch, scope["path"], query_string, body, headers)
+            except Exception as e:
+                log.error("pooled_prediction_failed", path=scope["path"], exc=e)
+                status, response_headers = 500, [("Content-Type", "application/json")]
+                response_body = json.dumps({"error": f"Prediction error: {str(e)}"}).encode()
+        finally:
+            self.pending -= 1
+
+        pool_seconds.labels(path=scope["path"]).observe(time.perf_counter() - started)
+        pool_requests.labels(path=scope["path"], status=status).inc()
+        await _send_response(send, status, response_headers, response_body)
+
+    def collect_metrics(self):
+        return [
+            ("asgi_pool_pending", "gauge", "Predictions waiting for or running in the pool",
+             [({}, self.pending)]),
+            ("asgi_pool_rejected_total", "counter", "Predictions refused with 503 because the queue was full",
+             [({}, self.rejected)])
+        ]
+
+app = AsyncPredictionApp()
+metrics.register_collector(app.collect_metrics)
@@ -0,0 +1,181 @@
+import argparse
+import collections
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Offline bulk scoring for the car and wheat models, e.g. the nightly
+# revaluation of the whole listed inventory:
+#
+#   python src/bulk_score.py car inventory.parquet prices.parquet --workers 8
+#   python src/bulk_score.py wheat samples.csv classes.parquet --batch-rows 100000
+#
+# The input (Parquet, Arrow IPC file or stream, or CSV) is read one record
+# batch at a time and each batch is scored with the same feature assembly and
+# vectorized predict the HTTP batch routes use, spread over a process pool.
+# At most two batches per worker are in flight and results are written to a
+# Parquet row group as soon as they come back, in input order, so memory stays
+# bounded however large the file is. The output holds the input columns plus
+# a prediction column (and a note column for car rows priced by the fallback).
+#
+# Needs pyarrow.
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+DEFAULT_BATCH_ROWS = 65536
+
+# ---- runs in the worker processes -------------------------------------------
+
+def _score_car(df):
+    import numpy as np
+    import roanne_carapp
+    prices, note = roanne_carapp.predict_chunk(roanne_carapp.prepare_frame(df))
+    # Rounded like the /car/predict responses
+    return {"prediction": np.round(np.asarray(prices, dtype=np.float64), 2), "note": [note] * len(df)}
+
+def _score_wheat(df):
+    import wileenAPP
+    return {"prediction": wileenAPP.predict_frame(wileenAPP.build_features(df))}
+
+SCORERS = {"car": _score_car, "wheat": _score_wheat}
+
+_scorer = None
+
+def _init_worker(model):
+    global _scorer
+    # Load the model and encoders once per process, not once per batch
+    from model_registry import registry
+    if model == "car":
+        import roanne_carapp
+    else:
+        import wileenAPP  # registers the wheat model
+    if registry.get(model) is None:
+        raise RuntimeError(f"{model} model could not be loaded")
+    if model == "car":
+        roanne_carapp.get_encoding()
+    _scorer = SCORERS[model]
+
+def _score(batch):
+    return _scorer(batch.to_pandas())
+
+# ---- input ------------------------------------------------------------------
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext in (".arrow", ".feather", ".ipc", ".arrows"):
+        return "arrow"
+    if ext in (".csv", ".txt"):
+        return "csv"
+    raise ValueError(f"Can't tell the format of {path}; pass --format")
+
+def read_batches(path, fmt, batch_rows):
+    import pyarrow as pa
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_rows)
+    elif fmt == "arrow":
+        import pyarrow.ipc
+        source = pa.memory_map(path)
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            batches = pa.ipc.open_stream(source)
+        for batch in batches:
+            # Arrow batches keep their original size; split oversized ones
+            for start in range(0, batch.num_rows, batch_rows):
+                yield batch.slice(start, batch_rows)
+    else:
+        import pyarrow.csv
+        # block_size bounds how much text is parsed at once; ~64 bytes per row is a rough guess
+        options = pa.csv.ReadOptions(block_size=max(1 << 20, batch_rows * 64))
+        yield from pa.csv.open_csv(path, read_options=options)
+
+# ---- output -----------------------------------------------------------------
+
+def with_predictions(batch, result):
+    import pyarrow as pa
+    arrays = list(batch.columns)
+    names = list(batch.schema.names)
+    for name, values in result.items():
+        arrays.append(pa.array(values, type=pa.string() if name == "note" else None))
+        names.append(name)
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+def score_file(model, input_path, output_path, fmt=None, workers=None, batch_rows=DEFAULT_BATCH_ROWS):
+    import pyarrow.parquet as pq
+
+    fmt = fmt or detect_format(input_path)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    writer = None
+    rows = 0
+
+    def write(batch, result):
+        nonlocal writer, rows
+        out = with_predictions(batch, result)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, out.schema)
+        writer.write_batch(out)
+        rows += out.num_rows
+
+    try:
+        if workers == 0:
+            # In-process, for debugging and small files
+            _init_worker(model)
+            for batch in read_batches(input_path, fmt, batch_rows):
+                write(batch, _score(batch))
+        else:
+            # forkserver/spawn: pyarrow's thread pools don't survive fork
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(model,)) as pool:
+                in_flight = collections.deque()
+                for batch in read_batches(input_path, fmt, batch_rows):
+                    in_flight.append((batch, pool.submit(_score, batch)))
+                    # Bounded read-ahead keeps memory flat and output in order
+                    if len(in_flight) >= workers * 2:
+                        done_batch, future = in_flight.popleft()
+                        write(done_batch, future.result())
+                while in_flight:
+                    done_batch, future = in_flight.popleft()
+                    write(done_batch, future.result())
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a Parquet, Arrow or CSV file with the car or wheat model")
+    parser.add_argument("model", choices=sorted(SCORERS))
+    parser.add_argument("input")
+    parser.add_argument("output", help="Parquet file to write")
+    parser.add_argument("--format", choices=["parquet", "arrow", "csv"], help="input format (default: from the extension)")
+    parser.add_argument("--workers", type=int, help="scoring processes (default: CPU count, 0 = in-process)")
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument("--artifacts", help="directory to load the model from (default: artifacts/)")
+    args = parser.parse_args()
+
+    if args.artifacts:
+        # Read by model_registry in this process and in the workers
+        os.environ["MODEL_ARTIFACTS_DIR"] = os.path.abspath(args.artifacts)
+
+    try:
+        import pyarrow
+    except ImportError:
+        sys.exit("bulk_score needs pyarrow (pip install pyarrow)")
+
+    started = time.perf_counter()
+    rows = score_file(args.model, args.input, args.output, args.format, args.workers, args.batch_rows)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s) -> {args.output}")
+
+if __name__ == "__main__":
+    main()
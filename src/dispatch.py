@@ -0,0 +1,72 @@
+import importlib
+import os
+
+# Schema-driven routing for the shared /predict endpoint. Each model module
+# registers itself once with the form fields it accepts, the trigger fields
+# that select it, a parse function (form -> validated payload) and a handler
+# (payload -> response). The trigger -> model index is built at registration
+# time, so resolving a request is a single pass over its field names, and the
+# parsed payload goes straight to the handler without the form being read
+# again.
+#
+# Only trigger fields pick a model, so a form that merely shares an optional
+# field with another model isn't sent there. When a form carries triggers of
+# several models, the lowest priority wins (car before wheat, as /predict has
+# always done); equal priorities fall back to registration order.
+#
+# Extra model modules can be loaded without editing main.py by listing them in
+# PREDICTION_MODULES (comma-separated module names importable from src/).
+
+# Priority for models registered without one (e.g. PREDICTION_MODULES plugins)
+DEFAULT_PRIORITY = 100
+
+class ModelRoute:
+    def __init__(self, name, fields, triggers, parse, handle, priority, order):
+        self.name = name
+        self.fields = tuple(fields)
+        self.triggers = tuple(triggers)
+        self.parse = parse
+        self.handle = handle
+        self.priority = priority
+        self.order = order
+
+    @property
+    def rank(self):
+        return (self.priority, self.order)
+
+class Dispatcher:
+    def __init__(self):
+        self.routes = {}
+        self._index = {}
+
+    def register(self, name, fields, parse, handle, triggers=None, priority=DEFAULT_PRIORITY):
+        # triggers defaults to every field the model accepts
+        route = ModelRoute(name, fields, fields if triggers is None else triggers,
+                           parse, handle, priority, len(self.routes))
+        self.routes[name] = route
+        for field in route.triggers:
+            current = self._index.get(field)
+            if current is None or route.rank < current.rank:
+                self._index[field] = route
+        return route
+
+    def resolve(self, field_names):
+        best = None
+        index = self._index
+        for field in field_names:
+            route = index.get(field)
+            if route is not None and (best is None or route.rank < best.rank):
+                best = route
+        return best
+
+    def fields(self):
+        return {name: list(route.fields) for name, route in self.routes.items()}
+
+def load_plugins():
+    for module_name in os.environ.get("PREDICTION_MODULES", "").split(","):
+        module_name = module_name.strip()
+        if module_name:
+            importlib.import_module(module_name)
+
+# Shared by main_app's /predict route and the model modules
+dispatcher = Dispatcher()
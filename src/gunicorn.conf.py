@@ -0,0 +1,30 @@
+import gc
+import multiprocessing
+import os
+
+# Run from the project root with:
+#   gunicorn -c src/gunicorn.conf.py
+#
+# The app (and every model in the registry) is imported once in the master and
+# shared copy-on-write with the forked workers. Each worker then runs a warm-up
+# prediction before it starts accepting requests.
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = "wsgi:app"
+preload_app = True
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', 10000)}")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's reach, so collections in the
+    # workers don't touch (and copy) the shared model pages
+    gc.freeze()
+    server.log.info("Models preloaded, forking workers")
+
+def post_worker_init(worker):
+    from model_registry import registry
+    for name, state in registry.warm_up().items():
+        worker.log.info(f"Worker {worker.pid} {name} model: {state}")
@@ -0,0 +1,83 @@
+import threading
+import weakref
+import numpy as np
+
+# Helpers for feeding models plain float64 arrays instead of one-row DataFrames.
+# Building a DataFrame costs more than predicting with these small models, so
+# the DataFrame is only built when some step of the model really uses column
+# names (e.g. PyCaret's TransformerWrapper selects columns by name).
+#
+# The shipped seed pipeline is such a PyCaret pipeline, so it always gets a
+# DataFrame here. Its NumPy path is the native model (native_model.py), which
+# unwraps the PyCaret steps and is fed these float64 rows directly.
+
+_NUMPY_SAFE_MODULES = ("sklearn.", "numpy")
+
+def _steps(model):
+    yield model
+    for _, step in getattr(model, "steps", []):
+        yield from _steps(step)
+    for attr in ("transformer", "estimator"):
+        inner = getattr(model, attr, None)
+        if inner is not None and hasattr(inner, "fit"):
+            yield from _steps(inner)
+
+def _check(model):
+    for step in _steps(model):
+        if step is None or step == "passthrough":
+            continue
+        # Fitted on a DataFrame: sklearn would warn about missing names on every call
+        if hasattr(step, "feature_names_in_"):
+            return True
+        # Anything outside sklearn may select columns by name
+        if not type(step).__module__.startswith(_NUMPY_SAFE_MODULES):
+            return True
+    return False
+
+# Weakly keyed, so a model retired by a hot reload or an eviction isn't kept
+# alive by its cached decision
+_decisions = weakref.WeakKeyDictionary()
+_decisions_lock = threading.Lock()
+
+def needs_column_names(model):
+    # Decided once per model object; a reloaded model gets a fresh decision
+    try:
+        return _decisions[model]
+    except KeyError:
+        pass
+    except TypeError:
+        # Not weak-referenceable: decide on every call
+        return _check(model)
+    decision = _check(model)
+    with _decisions_lock:
+        _decisions[model] = decision
+    return decision
+
+def forget(model):
+    # Drops the decision for an unloaded model right away
+    with _decisions_lock:
+        try:
+            _decisions.pop(model, None)
+        except TypeError:
+            pass
+
+class RowBuffer:
+    # One preallocated, contiguous (1, width) float64 row per thread
+    def __init__(self, width):
+        self.width = width
+        self._local = threading.local()
+
+    def get(self):
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = np.zeros((1, self.width), dtype=np.float64)
+        return row
+
+def stack_rows(rows):
+    # A single row is used as-is; several rows are copied into one contiguous block
+    if len(rows) == 1:
+        return np.ascontiguousarray(rows[0], dtype=np.float64).reshape(1, -1)
+    out = np.empty((len(rows), len(rows[0])), dtype=np.float64)
+    for i, row in enumerate(rows):
+        out[i] = row
+    return out
@@ -1,26 +1,85 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, g
 import sys
 import os
+import time
 
 # Add parent directory to path to ensure imports work
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 # Import the apps after adding the path
-from wileenAPP import wileen_app, load_model as load_wheat_model, model as wheat_model
+from wileenAPP import wileen_app
 from roanne_carapp import roanne_app
+from dispatch import dispatcher, load_plugins
+from schema import ValidationError
+from model_registry import registry
+from prediction_cache import prediction_cache
+from metrics import metrics, request_seconds, requests_total, CONTENT_TYPE
+from structured_log import log
+import model_host
+import static_pages
 
 main_app = Flask(__name__, template_folder='../templates')
 
+# Models outside this repo register with the dispatcher when imported
+load_plugins()
+
+@main_app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+def observe_request(started, method, path, endpoint, status):
+    elapsed = time.perf_counter() - started
+    request_seconds.labels(endpoint=endpoint).observe(elapsed)
+    requests_total.labels(endpoint=endpoint, status=status).inc()
+    log.info("request", sampled=True, method=method, path=path,
+             endpoint=endpoint, status=status, ms=round(elapsed * 1000, 3))
+
+@main_app.after_request
+def record_request(response):
+    # Per-endpoint latency and status counts for /metrics, plus a sampled access log line
+    started = g.get('request_started')
+    if started is not None:
+        args = (started, request.method, request.path, request.endpoint or 'not_found', response.status_code)
+        if response.is_streamed:
+            # Streaming responses (the batch routes) are timed until the last
+            # chunk has been sent, not until the generator was returned
+            response.call_on_close(lambda: observe_request(*args))
+        else:
+            observe_request(*args)
+    return response
+
+def collect_cache_metrics():
+    stats = prediction_cache.stats()
+    return [
+        ("prediction_cache_hits_total", "counter", "Prediction cache hits", [({}, stats["hits"])]),
+        ("prediction_cache_misses_total", "counter", "Prediction cache misses", [({}, stats["misses"])]),
+        ("prediction_cache_evictions_total", "counter", "Prediction cache evictions", [({}, stats["evictions"])]),
+        ("prediction_cache_entries", "gauge", "Entries in the in-process prediction cache", [({}, stats["size"])])
+    ]
+
+metrics.register_collector(collect_cache_metrics)
+
+# The pages have no per-request content: rendered once here and served from memory
+pages = static_pages.render_pages(main_app, {
+    'home': 'home.html',
+    'wheat': 'wheat.html',
+    'car': 'roanne_car.html'
+}) if static_pages.PRERENDER else {}
+
 @main_app.route('/')
 def home():
+    if 'home' in pages:
+        return pages['home'].response()
     return render_template('home.html')
 
 @main_app.route('/wheat')
 def wheat():
+    if 'wheat' in pages:
+        return pages['wheat'].response()
     try:
         return wileen_app.view_functions['home_page']()
     except Exception as e:
-        print(f"Error routing to wheat page: {e}")
+        log.error("page_error", page="wheat", exc=e)
         return f"Error loading wheat page: {str(e)}"
 
 @main_app.route('/wheat/process', methods=['POST'])
@@ -29,15 +88,26 @@ def wheat_process():
         # Pass the request to the wheat process_form function
         return wileen_app.view_functions['process_form']()
     except Exception as e:
-        print(f"Error in wheat_process: {e}")
+        log.error("route_error", route="wheat_process", exc=e)
         return jsonify({"error": f"Error processing wheat data: {str(e)}"})
 
+@main_app.route('/wheat/predict_batch', methods=['POST'])
+def wheat_predict_batch():
+    try:
+        # Pass the request to the wheat batch scoring function
+        return wileen_app.view_functions['predict_batch']()
+    except Exception as e:
+        log.error("route_error", route="wheat_predict_batch", exc=e)
+        return jsonify({"error": f"Error processing wheat batch: {str(e)}"})
+
 @main_app.route('/car')
 def car():
+    if 'car' in pages:
+        return pages['car'].response()
     try:
         return roanne_app.view_functions['home']()
     except Exception as e:
-        print(f"Error routing to car page: {e}")
+        log.error("page_error", page="car", exc=e)
         return f"Error loading car page: {str(e)}"
 
 @main_app.route('/car/predict', methods=['POST'])
@@ -46,26 +116,64 @@ def car_predict():
         # Pass the request to the car predict function
         return roanne_app.view_functions['predict']()
     except Exception as e:
-        print(f"Error in car_predict: {e}")
+        log.error("route_error", route="car_predict", exc=e)
         return jsonify({"error": f"Error predicting car price: {str(e)}"})
 
+@main_app.route('/car/predict_batch', methods=['POST'])
+def car_predict_batch():
+    try:
+        # Pass the request to the car batch scoring function (streams NDJSON)
+        return roanne_app.view_functions['predict_batch']()
+    except Exception as e:
+        log.error("route_error", route="car_predict_batch", exc=e)
+        return jsonify({"error": f"Error predicting car prices: {str(e)}"})
+
+@main_app.route('/car/suggest')
+def car_suggest():
+    try:
+        # Autocomplete for brand_model, location and the other categorical fields
+        return roanne_app.view_functions['suggest']()
+    except Exception as e:
+        log.error("route_error", route="car_suggest", exc=e)
+        return jsonify({"error": f"Error loading suggestions: {str(e)}"})
+
+# Any artifact in artifacts/ by name, within the per-worker model memory budget
+@main_app.route('/models')
+def models():
+    return model_host.status()
+
+@main_app.route('/models/<name>/predict', methods=['POST'])
+def model_predict(name):
+    try:
+        return model_host.predict(name)
+    except Exception as e:
+        log.error("route_error", route="model_predict", model=name, exc=e)
+        return jsonify({"error": f"Error making prediction: {str(e)}"}), 500
+
 # Route to handle direct /predict requests
 @main_app.route('/predict', methods=['POST'])
 def predict_direct():
     try:
-        form_data = request.form.to_dict()
-        
-        # Determine which prediction service to use based on the form fields
-        if any(key in form_data for key in ['year', 'kilometers_driven', 'brand_model']):
-            return car_predict()
-        elif any(key in form_data for key in ['area', 'perimeter', 'compactness', 'length', 'width']):
-            return wheat_process()
-        else:
+        form = request.form
+
+        # Determine which prediction service to use from the form fields.
+        # Every model registers its fields with the dispatcher.
+        route = dispatcher.resolve(form.keys())
+        if route is None:
             return jsonify({
                 "error": "Could not determine prediction type. Please include relevant fields for car or wheat prediction."
             })
+
+        # Parse once and hand the payload straight to the model's handler
+        try:
+            payload = route.parse(form)
+        except ValidationError as e:
+            return jsonify({"error": str(e), "fields": e.errors})
+        except Exception as e:
+            return jsonify({"error": str(e)})
+        return route.handle(payload)
     except Exception as e:
-        print(f"Error in direct predict route: {e}")
+        log.error("route_error", route="predict_direct", exc=e)
         return jsonify({"error": f"Prediction error: {str(e)}"})
 
 # Route to handle direct /process requests for wheat
@@ -74,7 +182,7 @@ def process_direct():
     try:
         return wheat_process()
     except Exception as e:
-        print(f"Error in direct process route: {e}")
+        log.error("route_error", route="process_direct", exc=e)
         return jsonify({"error": f"Wheat processing error: {str(e)}"})
 
 # Simplified debug route
@@ -90,7 +198,9 @@ def debug():
         debug_info = {
             "current_directory": os.getcwd(),
             "project_root": project_root,
-            "wheat_model_loaded": wheat_model is not None,
+            "wheat_model_loaded": registry.is_loaded('wheat'),
+            "models": registry.status(),
+            "prediction_fields": dispatcher.fields(),
             "available_routes": [rule.rule for rule in main_app.url_map.iter_rules()]
         }
         
@@ -98,16 +208,24 @@ def debug():
     except Exception as e:
         return jsonify({"error": str(e)})
 
+# Prometheus text exposition of latency histograms and counters
+@main_app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+# Prediction cache hit/miss/eviction counters
+@main_app.route('/cache/stats')
+def cache_stats():
+    return jsonify(prediction_cache.stats())
+
 # Add an error handler for 404 errors that returns JSON
 @main_app.errorhandler(404)
 def not_found_error(error):
-    return jsonify({"error": "Endpoint not found. Available endpoints include /car/predict, /wheat/process, /predict, and /process"}), 404
+    return jsonify({"error": "Endpoint not found. Available endpoints include /car/predict, /car/predict_batch, /car/suggest, /wheat/process, /wheat/predict_batch, /models/<name>/predict, /predict, and /process"}), 404
 
 if __name__ == '__main__':
-    # Print basic startup info
-    print(f"Starting main Flask app on port 5000")
-    print(f"Available routes:")
-    for rule in main_app.url_map.iter_rules():
-        print(f"- {rule.rule}")
+    # Log basic startup info
+    log.info("startup", app="main", port=5000,
+             routes=[rule.rule for rule in main_app.url_map.iter_rules()])
     
     main_app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+
+# Collects concurrent single-row predictions and runs them as one vectorized call.
+# The first waiting caller becomes the "leader": when other rows are already
+# queued it waits up to max_wait_ms for more (or until max_batch_size is reached),
+# runs predict_fn once for the group and hands every caller its own result. A
+# lone caller is scored at once; rows arriving while its batch runs queue up and
+# go out together in the next one. No background thread is used, so it is safe to
+# create at import time in a gunicorn master before workers fork. When the
+# batched call fails, its rows are retried one by one, so an error only reaches
+# the caller whose row caused it.
+
+class _PendingRow:
+    def __init__(self, row):
+        self.row = row
+        self.done = False
+        self.value = None
+        self.error = None
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        # predict_fn takes a list of rows and returns one result per row
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._cond = threading.Condition()
+        self._pending = []
+        self._leader_active = False
+        self.batches = 0
+        self.rows = 0
+        self.split_batches = 0
+
+    @classmethod
+    def from_env(cls, predict_fn):
+        # MICRO_BATCH_MAX_SIZE=1 turns batching off
+        return cls(predict_fn,
+                   max_batch_size=int(os.environ.get("MICRO_BATCH_MAX_SIZE", 64)),
+                   max_wait_ms=float(os.environ.get("MICRO_BATCH_WAIT_MS", 2)))
+
+    def submit(self, row):
+        if self.max_batch_size <= 1:
+            return self.predict_fn([row])[0]
+
+        pending = _PendingRow(row)
+        with self._cond:
+            self._pending.append(pending)
+            if len(self._pending) >= self.max_batch_size:
+                self._cond.notify_all()
+
+        while True:
+            with self._cond:
+                # Wait while another caller is leading a batch that may include us
+                while not pending.done and self._leader_active:
+                    self._cond.wait()
+                if pending.done:
+                    return pending.result()
+
+                self._leader_active = True
+                # A caller with nobody queued beside it is alone: waiting for
+                # rows that are not coming would only add max_wait to its latency
+                deadline = time.monotonic() + self.max_wait
+                while 1 < len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+
+            self._run(batch)
+            if pending.done:
+                return pending.result()
+
+    def _predict(self, batch):
+        values = self.predict_fn([p.row for p in batch])
+        if len(values) != len(batch):
+            raise ValueError(f"predict_fn returned {len(values)} results for {len(batch)} rows")
+        for p, value in zip(batch, values):
+            p.value = value
+
+    def _run(self, batch):
+        try:
+            self._predict(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+            else:
+                # One bad row must not fail its neighbours: rerun the rows one
+                # at a time so only the failing caller gets the error
+                self.split_batches += 1
+                for p in batch:
+                    try:
+                        self._predict([p])
+                    except Exception as row_error:
+                        p.error = row_error
+
+        with self._cond:
+            for p in batch:
+                p.done = True
+            self.batches += 1
+            self.rows += len(batch)
+            self._leader_active = False
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "split_batches": self.split_batches,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0
+        }
@@ -0,0 +1,180 @@
+import os
+import threading
+import numpy as np
+from flask import request
+from model_registry import registry
+from inference import needs_column_names, forget as forget_column_decision
+from native_model import compiled, forget as forget_native
+from metrics import metrics, predictions_total
+from responses import (UnsupportedFormat, columns_response, json_response, requested_format,
+                       unsupported_format_response)
+
+# Serves every model artifact in artifacts/ by name at /models/<name>/predict,
+# including ones no app has a form for (e.g. seed_type_classification.pkl).
+# Artifacts are registered with the shared registry under their file name
+# without the extension, so they load lazily and count against the same
+# per-worker memory budget (MODEL_MEMORY_BUDGET_MB) as the car and wheat
+# models; the least recently used ones are unloaded to make room and loaded
+# again on their next request. Artifacts an app already registered are
+# reachable under both names, e.g. seed_pipeline and wheat.
+#
+# Request body: {"instances": [...]} or a bare list, each instance either a
+# list of feature values in training order or an object of column -> value.
+# The response has one prediction per instance, as JSON, msgpack or Arrow
+# (?format= or Accept, as on the batch routes).
+
+ARTIFACT_SUFFIXES = (".pkg", ".joblib", ".pkl")
+
+# Artifact stem -> registry name
+_aliases = {}
+_aliases_lock = threading.Lock()
+
+# What the last discover() saw. A name that isn't known only triggers a rescan
+# when this changed, so requests for unknown models don't list the directory.
+_scanned = None
+
+def _stem(filename):
+    for suffix in ARTIFACT_SUFFIXES:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return None
+
+def _directory_mtime():
+    # Changes whenever an artifact is added, removed or renamed
+    try:
+        return os.stat(registry.artifacts_dir).st_mtime_ns
+    except OSError:
+        return None
+
+def _scan_signature(mtime):
+    # The name count changes when an app registers another model
+    return mtime, len(registry.names())
+
+def discover():
+    # Registers artifacts nobody has registered yet
+    global _scanned
+    with _aliases_lock:
+        # Read before listing, so a file added during the scan triggers another
+        mtime = _directory_mtime()
+        for name in registry.names():
+            _aliases.setdefault(name, name)
+            for filename in registry.filenames(name):
+                _aliases.setdefault(_stem(filename) or filename, name)
+        try:
+            filenames = sorted(os.listdir(registry.artifacts_dir))
+        except OSError:
+            filenames = []
+        for filename in filenames:
+            stem = _stem(filename)
+            if stem and stem not in _aliases:
+                registry.register(stem, [stem + suffix for suffix in ARTIFACT_SUFFIXES])
+                _aliases[stem] = stem
+        _scanned = _scan_signature(mtime)
+    return dict(_aliases)
+
+def resolve(name):
+    if name not in _aliases and _scan_signature(_directory_mtime()) != _scanned:
+        discover()
+    return _aliases.get(name)
+
+def feature_names(model):
+    # Column names the model was fitted with, if it recorded them
+    for step in (model, getattr(model, "steps", [[None, None]])[0][1]):
+        names = getattr(step, "feature_names_in_", None)
+        if names is not None:
+            return [str(n) for n in names]
+    return None
+
+def build_input(model, instances):
+    if not isinstance(instances, list) or not instances:
+        raise ValueError("instances must be a non-empty list")
+    columns = feature_names(model)
+
+    if all(isinstance(instance, dict) for instance in instances):
+        if columns is None:
+            columns = list(instances[0])
+        missing = sorted({c for instance in instances for c in columns if c not in instance})
+        if missing:
+            raise ValueError(f"Missing features: {', '.join(missing)}")
+        rows = [[instance[c] for c in columns] for instance in instances]
+    elif all(isinstance(instance, list) for instance in instances):
+        rows = instances
+        width = len(columns) if columns is not None else len(rows[0])
+        if any(len(row) != width for row in rows):
+            raise ValueError(f"Every instance needs {width} values")
+    else:
+        raise ValueError("instances must all be lists or all be objects")
+
+    if needs_column_names(model):
+        import pandas as pd
+        if columns is None:
+            raise ValueError("This model needs named features; send instances as objects")
+        return pd.DataFrame(rows, columns=columns)
+    try:
+        return np.asarray(rows, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("Feature values must be numbers")
+
+def predict(name):
+    # View function for /models/<name>/predict
+    try:
+        fmt = requested_format()
+    except UnsupportedFormat as e:
+        return unsupported_format_response(e)
+
+    registered = resolve(name)
+    if registered is None:
+        return json_response({"error": f"Unknown model {name!r}", "models": sorted(_aliases)}, 404)
+    model = registry.get(registered)
+    if model is None:
+        error = registry.status()[registered]["error"] or "artifact not found"
+        return json_response({"error": f"Model {name!r} is not available: {error}"}, 503)
+
+    body = request.get_json(silent=True)
+    instances = body.get("instances") if isinstance(body, dict) else body
+    try:
+        X = build_input(model, instances)
+    except ValueError as e:
+        predictions_total.labels(model=registered, outcome='error').inc()
+        return json_response({"error": str(e)}, 400)
+
+    # Only models with a sample row can be checked against sklearn, so only those run natively
+    sample = registry.sample(registered)
+    native = compiled(model, sample) if sample is not None else None
+    predictions = np.asarray((native or model).predict(X))
+    predictions_total.labels(model=registered, outcome='model').inc(len(predictions))
+    return columns_response(fmt, {"prediction": predictions},
+                            {"model": registered, "count": len(predictions)})
+
+def status():
+    # View function for /models
+    models = registry.status()
+    aliases = {}
+    for alias, name in discover().items():
+        if alias != name:
+            aliases.setdefault(name, []).append(alias)
+    return json_response({
+        "memory_budget_bytes": registry.memory_budget,
+        "memory_used_bytes": registry.memory_used(),
+        "models": {name: dict(state, aliases=aliases.get(name, [])) for name, state in models.items()}
+    })
+
+def collect_model_metrics():
+    models = registry.status()
+    return [
+        ("model_memory_bytes", "gauge", "Estimated memory held by each loaded model",
+         [({"model": name}, state["memory_bytes"]) for name, state in models.items() if state["loaded"]]),
+        ("model_memory_budget_bytes", "gauge", "Per-worker memory budget for loaded models (0 = none)",
+         [({}, registry.memory_budget)]),
+        ("model_loads_total", "counter", "Model loads from artifacts/",
+         [({"model": name}, state["loads"]) for name, state in models.items()]),
+        ("model_evictions_total", "counter", "Models unloaded to stay within the memory budget",
+         [({"model": name}, state["evictions"]) for name, state in models.items()])
+    ]
+
+discover()
+
+# Unloaded models must not be kept alive by the per-model caches
+registry.add_unload_listener(forget_native)
+registry.add_unload_listener(forget_column_decision)
+metrics.register_collector(collect_model_metrics)
@@ -0,0 +1,455 @@
+import os
+import hashlib
+import mmap
+import pickle
+import sys
+import threading
+import time
+import types
+import numpy as np
+from artifact_package import is_package, load_package, manifest_path
+from structured_log import log
+
+# Central place where the apps get their models from. Models are registered by
+# name at import time but only loaded from artifacts/ the first time they are
+# used. joblib artifacts are opened with mmap_mode='r' so their numpy arrays
+# live in the OS page cache and are shared between gunicorn workers instead of
+# being copied into each worker's heap.
+#
+# The mapping is taken from a private copy of the .joblib file, never from the
+# artifact itself: overwriting a mapped file in place (cp, truncate and write)
+# pulls the pages out from under the loaded model, and the next predict kills
+# the worker with SIGBUS. The copy is unlinked as soon as it is loaded, so
+# nothing else can write to it and it goes away with the model.
+# MODEL_SNAPSHOT_DIR picks where the copies are made (default: the system
+# temp directory). Packages are mapped directly; artifact_package.py only
+# ever replaces them by renaming a new directory into place.
+#
+# With MODEL_HOT_RELOAD=1 a background thread polls artifacts/ and, when a
+# registered artifact changes, loads and validates the new file off the request
+# path and then swaps it in with a single reference assignment. Requests that
+# already hold the old model finish on it.
+#
+# Packaged artifacts (<name>.pkg/, see artifact_package.py) are listed before
+# the plain pickles, so a model that has been packaged loads with version and
+# hash checks; the package's manifest stands in for the file when computing
+# signatures and fingerprints.
+#
+# Each loaded model's memory footprint is estimated when it loads. With
+# MODEL_MEMORY_BUDGET_MB set, loading a model that takes the worker over the
+# budget unloads the least recently used other models; they are loaded again
+# the next time they are asked for.
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+ARTIFACTS_DIR = os.environ.get("MODEL_ARTIFACTS_DIR", os.path.join(project_root, "artifacts"))
+
+# Retry delays after a failed or missing load, doubling up to the maximum
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+# Per-worker budget for loaded models, in MB; 0 means no limit
+MEMORY_BUDGET_MB = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", 0))
+
+# Where the private copies of mmap'd artifacts are made; None is the system temp dir
+SNAPSHOT_DIR = os.environ.get("MODEL_SNAPSHOT_DIR") or None
+
+_LEAF_TYPES = (str, bytes, int, float, complex, bool, type(None), np.generic)
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                  types.MethodType)
+
+def load_artifact(path):
+    if is_package(path):
+        return load_package(path)
+    if path.endswith(".joblib"):
+        return load_joblib_snapshot(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def load_joblib_snapshot(path):
+    # Maps the arrays from a private copy of path (see the top of the file)
+    import joblib
+    import shutil
+    import tempfile
+    fd, snapshot = tempfile.mkstemp(prefix="model-", suffix=".joblib", dir=SNAPSHOT_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out, open(path, "rb") as f:
+            shutil.copyfileobj(f, out, 1 << 20)
+        return joblib.load(snapshot, mmap_mode="r")
+    finally:
+        # The mappings keep the copy's pages alive until the model is dropped
+        os.unlink(snapshot)
+
+def hash_file(path):
+    if is_package(path):
+        # The manifest records the model's sha256, so hashing it is enough
+        path = manifest_path(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _is_mapped(array):
+    # File-backed: joblib's np.memmap or a view into a package's arrays.bin
+    if isinstance(array, np.memmap):
+        return True
+    base = array.base
+    if isinstance(base, memoryview):
+        base = base.obj
+    return isinstance(base, mmap.mmap)
+
+def footprint(model):
+    # Estimated bytes held by a model: every array reachable from it, counted
+    # once through its base, plus the Python objects around them. Returns
+    # (total, mapped); mapped is the file-backed part, which the page cache
+    # shares between workers.
+    total = mapped = 0
+    seen = set()
+    made = []
+    stack = [model]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+
+        if isinstance(obj, np.ndarray):
+            if isinstance(obj.base, np.ndarray):
+                stack.append(obj.base)
+                continue
+            total += obj.nbytes
+            if _is_mapped(obj):
+                mapped += obj.nbytes
+            if obj.dtype.hasobject:
+                stack.extend(obj.ravel())
+            continue
+
+        total += sys.getsizeof(obj)
+        if isinstance(obj, _LEAF_TYPES):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            state = getattr(obj, "__dict__", None)
+            if state is None:
+                # Extension types such as sklearn's Tree keep their arrays in C
+                # and only hand them out through __getstate__
+                try:
+                    state = obj.__getstate__()
+                except Exception:
+                    state = None
+            if isinstance(state, dict):
+                # Held until the walk ends: these are fresh objects whose ids
+                # could otherwise be reused and mistaken for ones already seen
+                made.append(state)
+                stack.extend(state.values())
+    return total, mapped
+
+def file_signature(path):
+    stat = os.stat(manifest_path(path) if is_package(path) else path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+class _Entry:
+    def __init__(self, name, filenames, loader, fallback, sample):
+        self.name = name
+        self.filenames = filenames
+        self.loader = loader
+        self.fallback = fallback
+        self.sample = sample
+        self.model = None
+        self.path = None
+        self.signature = None
+        self.fingerprint = None
+        self.loaded_at = None
+        self.error = None
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.reloads = 0
+        self.loads = 0
+        self.evictions = 0
+        self.memory_bytes = 0
+        self.mapped_bytes = 0
+        self.last_used = 0.0
+        self.lock = threading.Lock()
+
+    def measure(self):
+        self.memory_bytes, self.mapped_bytes = footprint(self.model) if self.model is not None else (0, 0)
+
+class ModelRegistry:
+    def __init__(self, artifacts_dir=ARTIFACTS_DIR, memory_budget=int(MEMORY_BUDGET_MB * 2 ** 20)):
+        self.artifacts_dir = artifacts_dir
+        self.memory_budget = memory_budget
+        self._entries = {}
+        self._unload_listeners = []
+        self._budget_lock = threading.Lock()
+        self.hot_reload = os.environ.get("MODEL_HOT_RELOAD", "0") == "1"
+        self.reload_interval = float(os.environ.get("MODEL_RELOAD_INTERVAL", 5))
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+
+    def register(self, name, filenames, loader=load_artifact, fallback=None, sample=None):
+        # filenames are tried in order; fallback() builds a stand-in model
+        # when none of them exist; sample() returns one row of model input
+        # used to validate reloaded artifacts
+        if name not in self._entries:
+            self._entries[name] = _Entry(name, list(filenames), loader, fallback, sample)
+        return self._entries[name]
+
+    def names(self):
+        return list(self._entries)
+
+    def filenames(self, name):
+        return list(self._entries[name].filenames)
+
+    def resolve_path(self, name):
+        for filename in self._entries[name].filenames:
+            path = os.path.join(self.artifacts_dir, filename)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get(self, name):
+        if self.hot_reload:
+            self._ensure_watcher()
+
+        entry = self._entries[name]
+        entry.last_used = time.monotonic()
+        model = entry.model
+        if model is not None:
+            return model
+
+        # Don't hit the disk on every request while the artifact is missing or broken
+        if entry.last_used < entry.next_attempt:
+            return None
+
+        loaded = False
+        with entry.lock:
+            if entry.model is None and time.monotonic() >= entry.next_attempt:
+                self._load(entry)
+                loaded = True
+            model = entry.model
+        if loaded and model is not None:
+            self.enforce_budget(keep=entry)
+        return model
+
+    def _load(self, entry):
+        path = self.resolve_path(entry.name)
+        try:
+            if path is not None:
+                signature = file_signature(path)
+                entry.model = entry.loader(path)
+                entry.path = path
+                entry.signature = signature
+                entry.fingerprint = hash_file(path)
+                log.info("model_loaded", model=entry.name, path=path)
+            elif entry.fallback is not None:
+                entry.model = entry.fallback()
+                entry.fingerprint = f"fallback:{type(entry.model).__name__}"
+                log.warning("model_missing", model=entry.name, fallback=True)
+            else:
+                log.warning("model_missing", model=entry.name, artifacts_dir=self.artifacts_dir)
+            entry.error = None
+        except Exception as e:
+            log.error("model_load_failed", model=entry.name, path=path, exc=e)
+            entry.error = str(e)
+
+        if entry.model is None:
+            self._schedule_retry(entry)
+        else:
+            entry.failures = 0
+            entry.next_attempt = 0.0
+            entry.loaded_at = time.time()
+            entry.loads += 1
+            entry.measure()
+
+    def _schedule_retry(self, entry):
+        entry.failures += 1
+        delay = min(RETRY_BASE_SECONDS * 2 ** (entry.failures - 1), RETRY_MAX_SECONDS)
+        entry.next_attempt = time.monotonic() + delay
+
+    def validate(self, entry, model):
+        if not hasattr(model, "predict"):
+            raise TypeError(f"{type(model).__name__} has no predict method")
+        if entry.sample is not None:
+            result = model.predict(entry.sample())
+            if len(result) != 1:
+                raise ValueError(f"expected 1 prediction for the sample row, got {len(result)}")
+
+    def reload(self, name):
+        # Load the current artifact next to the live model and swap it in only
+        # once it has loaded and validated. Returns True when a swap happened.
+        entry = self._entries[name]
+        path = self.resolve_path(name)
+        if path is None:
+            return False
+        signature = file_signature(path)
+        if signature == entry.signature or time.monotonic() < entry.next_attempt:
+            return False
+
+        try:
+            model = entry.loader(path)
+            self.validate(entry, model)
+            fingerprint = hash_file(path)
+        except Exception as e:
+            log.error("model_reload_rejected", model=name, path=path, exc=e)
+            entry.error = str(e)
+            # Remember the bad file so it isn't retried until it changes again
+            entry.signature = signature
+            self._schedule_retry(entry)
+            return False
+
+        with entry.lock:
+            entry.model = model
+            entry.path = path
+            entry.signature = signature
+            entry.fingerprint = fingerprint
+            entry.loaded_at = time.time()
+            entry.error = None
+            entry.failures = 0
+            entry.next_attempt = 0.0
+            entry.reloads += 1
+            entry.measure()
+        log.info("model_reloaded", model=name, path=path)
+        self.enforce_budget(keep=entry)
+        return True
+
+    def add_unload_listener(self, listener):
+        # listener(model) is called after a model is unloaded, so caches keyed
+        # on the model object can let go of it
+        self._unload_listeners.append(listener)
+
+    def unload(self, name):
+        # Drops the loaded model; the next get() loads it again. Requests
+        # already holding it finish on it. Returns False if there was nothing
+        # to unload or the model is being loaded right now.
+        entry = self._entries[name]
+        if not entry.lock.acquire(blocking=False):
+            return False
+        try:
+            model = entry.model
+            if model is None:
+                return False
+            entry.model = None
+            entry.signature = None
+            entry.evictions += 1
+        finally:
+            entry.lock.release()
+        for listener in self._unload_listeners:
+            listener(model)
+        log.info("model_unloaded", model=name, memory_bytes=entry.memory_bytes)
+        return True
+
+    def memory_used(self):
+        return sum(entry.memory_bytes for entry in list(self._entries.values()) if entry.model is not None)
+
+    def enforce_budget(self, keep=None):
+        # Unloads least recently used models until the loaded ones fit in the
+        # budget. keep (the model that was just loaded) is never unloaded, even
+        # when it doesn't fit on its own.
+        if not self.memory_budget:
+            return []
+        unloaded = []
+        with self._budget_lock:
+            used = self.memory_used()
+            loaded = [entry for entry in list(self._entries.values()) if entry.model is not None]
+            for entry in sorted(loaded, key=lambda e: e.last_used):
+                if used <= self.memory_budget:
+                    break
+                size = entry.memory_bytes
+                if entry is not keep and self.unload(entry.name):
+                    used -= size
+                    unloaded.append(entry.name)
+            if used > self.memory_budget:
+                log.warning("model_memory_over_budget", used_bytes=used, budget_bytes=self.memory_budget)
+        return unloaded
+
+    def _ensure_watcher(self):
+        # Threads don't survive fork, so each gunicorn worker starts its own
+        if self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            thread = threading.Thread(target=self._watch, name="model-reload", daemon=True)
+            thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval)
+            for name, entry in list(self._entries.items()):
+                # Models that were never used stay lazy
+                if entry.model is None and entry.failures == 0:
+                    continue
+                try:
+                    self.reload(name)
+                except Exception as e:
+                    log.error("model_reload_check_failed", model=name, exc=e)
+
+    def put(self, name, model):
+        # Replace a model in place (used by tests and reloads)
+        entry = self._entries[name]
+        entry.model = model
+        entry.fingerprint = f"put:{id(model)}"
+        entry.error = None
+        entry.measure()
+
+    def sample(self, name):
+        # The registered sample() function, or None
+        return self._entries[name].sample
+
+    def fingerprint(self, name):
+        # Content hash of the artifact behind the current model; changes
+        # whenever the model is reloaded or replaced
+        return self._entries[name].fingerprint
+
+    def is_loaded(self, name):
+        return self._entries[name].model is not None
+
+    def load_all(self):
+        for name in self._entries:
+            self.get(name)
+
+    def warm_up(self):
+        # Load every model and run one prediction on its sample row so the
+        # first real request doesn't pay for lazy imports and cold caches
+        results = {}
+        for name, entry in list(self._entries.items()):
+            model = self.get(name)
+            if model is None:
+                results[name] = "not loaded"
+                continue
+            if entry.sample is None:
+                results[name] = "loaded"
+                continue
+            try:
+                model.predict(entry.sample())
+                results[name] = "warm"
+            except Exception as e:
+                results[name] = f"warm-up failed: {e}"
+        return results
+
+    def status(self):
+        return {
+            name: {
+                "loaded": entry.model is not None,
+                "path": entry.path,
+                "sha256": entry.fingerprint,
+                "loaded_at": entry.loaded_at,
+                "reloads": entry.reloads,
+                "loads": entry.loads,
+                "evictions": entry.evictions,
+                "memory_bytes": entry.memory_bytes if entry.model is not None else 0,
+                "mapped_bytes": entry.mapped_bytes if entry.model is not None else 0,
+                "failures": entry.failures,
+                "error": entry.error
+            }
+            for name, entry in list(self._entries.items())
+        }
+
+# Shared by wileenAPP, roanne_carapp, app and main
+registry = ModelRegistry()
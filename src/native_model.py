@@ -0,0 +1,404 @@
+import os
+import threading
+import weakref
+import numpy as np
+from structured_log import log
+
+# Native evaluation of small fitted sklearn models. The estimator is walked
+# once and flattened into plain NumPy arrays, so a predict call is a handful
+# of vectorized array operations with none of sklearn's per-call validation,
+# check_array or dtype juggling.
+#
+# Supported: Pipelines made of SimpleImputer and Standard/MinMax/Robust/MaxAbs
+# scalers, followed by a linear model or a tree ensemble (random forests,
+# extra trees, gradient boosting regressors). Anything else, including single
+# decision trees (sklearn already walks one tree faster than NumPy can) and
+# LightGBM boosters, is unsupported: compiled() logs why and returns None so
+# callers keep using the original model. A compiled model is only used after
+# it reproduced the original prediction on the sample row.
+#
+# PyCaret pipelines are unwrapped the way PyCaret predicts with them: each
+# TransformerWrapper's inner transformer is applied to the columns it was
+# fitted on, wrappers with no columns and train-only steps (outlier removal,
+# resampling) are skipped, and a label-encoding step turns the predicted class
+# indices back into the original labels.
+#
+# Trees are walked level by level for all rows and trees at once, which beats
+# sklearn's per-call overhead for micro-batches but not its Cython loop on bulk
+# input, so calls with more than NATIVE_TREE_MAX_ROWS rows go to sklearn.
+#
+# Set NATIVE_INFERENCE=0 to always use sklearn.
+
+ENABLED = os.environ.get("NATIVE_INFERENCE", "1") != "0"
+TREE_MAX_ROWS = int(os.environ.get("NATIVE_TREE_MAX_ROWS", 64))
+
+# Regression results may differ from sklearn in the last bits (summation order)
+RTOL = 1e-9
+ATOL = 1e-9
+
+class Unsupported(Exception):
+    pass
+
+# ---- compiled steps ---------------------------------------------------------
+
+class _Impute:
+    def __init__(self, fill):
+        self.fill = fill
+
+    def transform(self, X):
+        return np.where(np.isnan(X), self.fill, X)
+
+class _Affine:
+    # ((X - sub) / div) * mul + add, in the order sklearn applies them, so the
+    # identity parts (0 and 1) leave the values bit-for-bit unchanged
+    def __init__(self, n, sub=None, div=None, mul=None, add=None, clip=None):
+        self.sub = np.zeros(n) if sub is None else np.asarray(sub, dtype=np.float64)
+        self.div = np.ones(n) if div is None else np.asarray(div, dtype=np.float64)
+        self.mul = np.ones(n) if mul is None else np.asarray(mul, dtype=np.float64)
+        self.add = np.zeros(n) if add is None else np.asarray(add, dtype=np.float64)
+        self.clip = clip
+
+    def transform(self, X):
+        X = (X - self.sub) / self.div * self.mul + self.add
+        if self.clip is not None:
+            X = np.clip(X, *self.clip)
+        return X
+
+class _LinearRegressor:
+    def __init__(self, coef, intercept):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    def predict(self, X):
+        return X @ self.coef + self.intercept
+
+class _LinearClassifier:
+    def __init__(self, coef, intercept, classes):
+        self.coef = np.ascontiguousarray(np.atleast_2d(coef).T, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = classes
+
+    def predict(self, X):
+        scores = X @ self.coef + self.intercept
+        if scores.shape[1] == 1:
+            indices = (scores[:, 0] > 0).astype(np.intp)
+        else:
+            indices = scores.argmax(axis=1)
+        return self.classes.take(indices)
+
+class _TreeEnsemble:
+    # Every tree's nodes concatenated into flat arrays. Leaves point to
+    # themselves with an infinite threshold, so all rows can walk all trees
+    # for max_depth steps in lockstep.
+    def __init__(self, trees, scale, bias, classes=None):
+        feature, threshold, left, right, values, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            n = tree.node_count
+            nodes = np.arange(offset, offset + n)
+            is_leaf = tree.children_left == -1
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+            right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+            value = tree.value[:, 0, :]
+            if classes is not None:
+                # Per-tree class probabilities, as in DecisionTreeClassifier.predict_proba
+                totals = value.sum(axis=1, keepdims=True)
+                value = value / np.where(totals == 0, 1.0, totals)
+            values.append(value)
+            roots.append(offset)
+            offset += n
+
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        # children[2 * node + went_left]: one gather per level instead of two plus a select
+        self.children = np.stack([np.concatenate(right), np.concatenate(left)], axis=1).ravel().astype(np.intp)
+        self.values = np.concatenate(values).astype(np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.depth = max(tree.max_depth for tree in trees)
+        self.scale = scale
+        self.bias = bias
+        self.classes = classes
+
+    def leaves(self, X):
+        # sklearn's trees compare float32 inputs against float64 thresholds
+        X = X.astype(np.float32)
+        nodes = np.repeat(self.roots[np.newaxis, :], len(X), axis=0)
+        rows = np.arange(len(X))[:, np.newaxis]
+        feature, threshold, children = self.feature, self.threshold, self.children
+        for _ in range(self.depth):
+            # NaN compares False and goes right, as in sklearn
+            went_left = X[rows, feature[nodes]] <= threshold[nodes]
+            nodes = children[2 * nodes + went_left]
+        return nodes
+
+    def predict(self, X):
+        summed = self.values[self.leaves(X)].sum(axis=1)
+        if self.classes is None:
+            return summed[:, 0] * self.scale + self.bias
+        return self.classes.take(summed.argmax(axis=1))
+
+class _Columns:
+    # A transform fitted on some of the columns; the others pass through
+    def __init__(self, inner, positions):
+        self.inner = inner
+        self.positions = np.asarray(positions, dtype=np.intp)
+
+    def transform(self, X):
+        X = X.copy()
+        X[:, self.positions] = self.inner.transform(X[:, self.positions])
+        return X
+
+class _Decode:
+    # LabelEncoder.inverse_transform: class index -> original label
+    def __init__(self, classes):
+        self.classes = np.asarray(classes)
+
+    def transform(self, y):
+        return self.classes.take(np.asarray(y, dtype=np.intp))
+
+class NativeModel:
+    def __init__(self, model, transforms, predictor, n_features, max_rows=None,
+                 decoders=(), columns=None):
+        # Weak, so the cache entry keyed on the model doesn't keep it alive
+        self._model = weakref.ref(model)
+        self.transforms = transforms
+        self.predictor = predictor
+        self.n_features = n_features
+        self.max_rows = max_rows
+        self.decoders = list(decoders)
+        # Input column names, for handing plain arrays back to a model that selects by name
+        self.columns = columns
+
+    def predict(self, X):
+        if self.max_rows is not None and len(X) > self.max_rows:
+            if self.columns is not None and not hasattr(X, "columns"):
+                import pandas as pd
+                X = pd.DataFrame(X, columns=self.columns)
+            return self._model().predict(X)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got shape {X.shape}")
+        for step in self.transforms:
+            X = step.transform(X)
+        y = self.predictor.predict(X)
+        for decoder in self.decoders:
+            y = decoder.transform(y)
+        return y
+
+# ---- compiler ---------------------------------------------------------------
+
+def _compile_transform(step):
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler, MaxAbsScaler
+
+    n = step.n_features_in_
+    kind = type(step)
+    if kind is StandardScaler:
+        return _Affine(n, sub=step.mean_ if step.with_mean else None,
+                       div=step.scale_ if step.with_std else None)
+    if kind is MinMaxScaler:
+        return _Affine(n, mul=step.scale_, add=step.min_,
+                       clip=step.feature_range if getattr(step, "clip", False) else None)
+    if kind is RobustScaler:
+        return _Affine(n, sub=step.center_ if step.with_centering else None,
+                       div=step.scale_ if step.with_scaling else None)
+    if kind is MaxAbsScaler:
+        return _Affine(n, div=step.scale_)
+    if kind is SimpleImputer:
+        statistics = np.asarray(step.statistics_, dtype=np.float64)
+        # sklearn drops all-NaN columns and adds indicator columns; neither is mirrored
+        if step.add_indicator or np.isnan(statistics).any() or not _is_nan(step.missing_values):
+            raise Unsupported("SimpleImputer configuration")
+        return _Impute(statistics)
+    raise Unsupported(kind.__name__)
+
+def _is_nan(value):
+    return isinstance(value, float) and np.isnan(value)
+
+def _single_output_trees(estimators):
+    trees = [e.tree_ for e in estimators]
+    if any(tree.n_outputs != 1 for tree in trees):
+        raise Unsupported("multi-output trees")
+    return trees
+
+def _compile_predictor(est):
+    from sklearn import linear_model, ensemble
+    from sklearn.dummy import DummyRegressor
+
+    kind = type(est)
+    if kind in (linear_model.LinearRegression, linear_model.Ridge, linear_model.RidgeCV,
+                linear_model.Lasso, linear_model.LassoCV, linear_model.ElasticNet,
+                linear_model.ElasticNetCV, linear_model.Lars, linear_model.LassoLars,
+                linear_model.BayesianRidge, linear_model.ARDRegression,
+                linear_model.HuberRegressor, linear_model.SGDRegressor):
+        coef = np.asarray(est.coef_, dtype=np.float64)
+        if coef.ndim != 1:
+            raise Unsupported("multi-output linear model")
+        return _LinearRegressor(coef, np.ravel(est.intercept_)[0])
+
+    if kind in (linear_model.LogisticRegression, linear_model.RidgeClassifier,
+                linear_model.SGDClassifier, linear_model.Perceptron):
+        return _LinearClassifier(est.coef_, est.intercept_, est.classes_)
+
+    if kind in (ensemble.RandomForestRegressor, ensemble.ExtraTreesRegressor):
+        return _TreeEnsemble(_single_output_trees(est.estimators_), 1.0 / len(est.estimators_), 0.0)
+    if kind in (ensemble.RandomForestClassifier, ensemble.ExtraTreesClassifier):
+        if est.n_outputs_ != 1:
+            raise Unsupported("multi-output forest")
+        return _TreeEnsemble(_single_output_trees(est.estimators_), 1.0 / len(est.estimators_), 0.0,
+                             classes=est.classes_)
+
+    if kind.__module__.startswith("lightgbm."):
+        # Boosters are evaluated by lightgbm's own C++ code already
+        raise Unsupported(f"{kind.__name__} (LightGBM)")
+
+    if kind is ensemble.GradientBoostingRegressor:
+        if isinstance(est.init_, str) and est.init_ == "zero":
+            bias = 0.0
+        elif type(est.init_) is DummyRegressor:
+            bias = float(np.ravel(est.init_.constant_)[0])
+        else:
+            raise Unsupported("GradientBoostingRegressor init estimator")
+        return _TreeEnsemble(_single_output_trees(est.estimators_[:, 0]), est.learning_rate, bias)
+
+    raise Unsupported(kind.__name__)
+
+def _is_wrapper(step):
+    # PyCaret's TransformerWrapper: a fitted transformer plus the columns it applies to
+    return hasattr(step, "transformer") and hasattr(step, "_include") and hasattr(step, "_feature_names_in")
+
+def _transforms_x(transformer):
+    from inspect import signature
+    return "X" in signature(transformer.transform).parameters
+
+def _wrapper_columns(step):
+    # PyCaret records the target after the feature columns
+    names = step._feature_names_in
+    if names is None:
+        raise Unsupported("TransformerWrapper fitted without column names")
+    target = getattr(step, "target_name_", None)
+    return [name for name in names if name != target]
+
+def _compile_wrapper(step, columns, decoders):
+    # Returns the compiled transform for the wrapper, or None when it leaves X unchanged
+    inner = step.transformer
+    if hasattr(step, "inverse_transform"):
+        from sklearn.preprocessing import LabelEncoder
+        if type(inner) is not LabelEncoder or _transforms_x(inner):
+            raise Unsupported(f"inverse-transforming {type(inner).__name__}")
+        decoders.insert(0, _Decode(inner.classes_))
+        return None
+    if not _transforms_x(inner):
+        return None
+    include = step._include
+    if include is None:
+        raise Unsupported("unfitted TransformerWrapper")
+    if not include:
+        return None
+    positions = [columns.index(name) for name in include if name not in step._exclude]
+    compiled_step = _compile_transform(inner)
+    if positions == list(range(len(columns))):
+        return compiled_step
+    return _Columns(compiled_step, positions)
+
+def compile_model(model):
+    # Raises Unsupported for anything that can't be evaluated natively
+    from sklearn.pipeline import Pipeline
+
+    if isinstance(model, Pipeline):
+        steps = [step for _, step in model.steps if step is not None and step != "passthrough"]
+    else:
+        steps = [model]
+    if not steps:
+        raise Unsupported("empty pipeline")
+
+    # The final estimator first: it decides most unsupported models
+    predictor = _compile_predictor(steps[-1])
+
+    transforms, decoders, columns, n_features = [], [], None, None
+    for step in steps[:-1]:
+        # Outlier removal and resampling only run while fitting
+        if getattr(step, "_train_only", False):
+            continue
+        if _is_wrapper(step):
+            step_columns = _wrapper_columns(step)
+            if columns is None:
+                columns = step_columns
+            elif step_columns != columns:
+                raise Unsupported("pipeline step changes the columns")
+            compiled_step = _compile_wrapper(step, columns, decoders)
+        else:
+            if columns is not None:
+                raise Unsupported("plain step after a TransformerWrapper")
+            compiled_step = _compile_transform(step)
+            n_features = n_features or step.n_features_in_
+        if compiled_step is not None:
+            transforms.append(compiled_step)
+
+    if columns is not None:
+        n_features = len(columns)
+    elif n_features is None:
+        n_features = getattr(steps[-1], "n_features_in_", None)
+    if n_features is None:
+        raise Unsupported("unfitted estimator")
+    max_rows = TREE_MAX_ROWS if isinstance(predictor, _TreeEnsemble) else None
+    return NativeModel(model, transforms, predictor, n_features, max_rows, decoders, columns)
+
+def _matches(native, model, sample):
+    expected = np.asarray(model.predict(sample))
+    actual = native.predict(sample)
+    if expected.dtype.kind == "f":
+        return np.allclose(actual, expected, rtol=RTOL, atol=ATOL)
+    return np.array_equal(actual, expected)
+
+# ---- per-model cache --------------------------------------------------------
+
+# Weakly keyed, so a model retired by a hot reload or an eviction isn't kept
+# alive by its compiled form
+_compiled = weakref.WeakKeyDictionary()
+_compiled_lock = threading.Lock()
+
+def compiled(model, sample=None):
+    # The native model for this sklearn model, or None to keep using sklearn.
+    # Decided once per model object; a reloaded model is compiled afresh.
+    if not ENABLED or model is None:
+        return None
+    try:
+        return _compiled[model]
+    except KeyError:
+        pass
+    except TypeError:
+        # Not weak-referenceable, so there is nowhere to keep the result
+        return None
+
+    with _compiled_lock:
+        if model in _compiled:
+            return _compiled[model]
+        native = None
+        try:
+            native = compile_model(model)
+            if sample is not None and not _matches(native, model, sample()):
+                log.warning("native_mismatch", estimator=type(model).__name__)
+                native = None
+        except Unsupported as e:
+            log.info("native_unsupported", estimator=type(model).__name__, reason=str(e))
+        except Exception as e:
+            log.warning("native_compile_failed", estimator=type(model).__name__, exc=e)
+            native = None
+        _compiled[model] = native
+        return native
+
+def forget(model):
+    # Drops the compiled form of an unloaded model right away
+    with _compiled_lock:
+        try:
+            _compiled.pop(model, None)
+        except TypeError:
+            pass
+
+def compile_registered(registry):
+    # Compiles every registered model up front (used when preloading)
+    return {name: "native" if compiled(registry.get(name), registry.sample(name)) else "sklearn"
+            for name in registry.names()}
@@ -0,0 +1,151 @@
+import os
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Bounded LRU cache for prediction results, with an optional SQLite tier that
+# is shared by every worker on the machine (PREDICTION_CACHE_DB=/path/to.db).
+# Keys include the model's artifact hash from the registry, so entries for an
+# old model are never served after a reload.
+
+def canonical_value(value):
+    # "2018", 2018 and 2018.0 should all hit the same entry
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    if isinstance(value, bool) or value is None:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+def canonical_key(model_name, fingerprint, columns, values):
+    # values is a mapping or a sequence in the same order as columns
+    if isinstance(values, dict):
+        values = [values.get(col) for col in columns]
+    return (model_name, fingerprint) + tuple(canonical_value(v) for v in values)
+
+class _DiskTier:
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _connection(self):
+        # sqlite connections can't be shared between threads or across fork
+        conn, pid = getattr(self._local, "conn", (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = (conn, os.getpid())
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM predictions WHERE key = ?", (repr(key),)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, key, value):
+        conn = self._connection()
+        conn.execute("INSERT OR REPLACE INTO predictions (key, value) VALUES (?, ?)",
+                     (repr(key), json.dumps(value)))
+        self._writes += 1
+        # Trim the oldest rows now and then rather than on every write
+        if self._writes % 1000 == 0:
+            conn.execute(
+                "DELETE FROM predictions WHERE rowid <= "
+                "(SELECT MAX(rowid) FROM predictions) - ?", (self.max_entries,))
+
+class PredictionCache:
+    def __init__(self, max_entries=4096, disk_path=None, max_disk_entries=1000000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = _DiskTier(disk_path, max_disk_entries) if disk_path else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.disk_errors = 0
+
+    @classmethod
+    def from_env(cls):
+        # PREDICTION_CACHE_SIZE=0 turns caching off
+        return cls(max_entries=int(os.environ.get("PREDICTION_CACHE_SIZE", 4096)),
+                   disk_path=os.environ.get("PREDICTION_CACHE_DB"))
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        # Returns None on a miss
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error:
+                self.disk_errors += 1
+            if value is not None:
+                self.disk_hits += 1
+                self._put_memory(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        self._put_memory(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value)
+            except sqlite3.Error:
+                self.disk_errors += 1
+
+    def _put_memory(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_enabled": self.disk is not None,
+                "disk_hits": self.disk_hits,
+                "disk_errors": self.disk_errors
+            }
+
+# Shared by the car, wheat and housing prediction routes
+prediction_cache = PredictionCache.from_env()
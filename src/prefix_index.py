@@ -0,0 +1,52 @@
+import bisect
+from functools import lru_cache
+
+# Compact prefix index for autocomplete. Every value is indexed under its
+# full text and under the start of each later word, case-folded, in one
+# sorted list of keys, so a lookup is a binary search plus a short scan of
+# the matching range. "swi" finds "Maruti Swift Dzire VDI" as well as values
+# that start with it.
+#
+# Values that start with the query rank before values where only a later
+# word matches; within each group, values keep their vocabulary order (rank),
+# so a vocabulary listed most-common-first suggests common values first.
+# Results are memoized per (prefix, k).
+
+class PrefixIndex:
+    def __init__(self, values):
+        self.values = []
+        entries = []
+        seen = set()
+        for value in values:
+            if value in seen:
+                continue
+            seen.add(value)
+            rank = len(self.values)
+            self.values.append(value)
+            words = value.casefold().split()
+            for position in range(len(words)):
+                # word_match is 0 for the full value, 1 for a later word
+                entries.append((" ".join(words[position:]), 1 if position else 0, rank))
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._entries = [(word_match, rank) for _, word_match, rank in entries]
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _lookup(self, prefix, k):
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + "\U0010ffff", start)
+        best = {}
+        for word_match, rank in self._entries[start:end]:
+            if best.get(rank, 2) > word_match:
+                best[rank] = word_match
+        ranked = sorted(best, key=lambda rank: (best[rank], rank))[:k]
+        return tuple(self.values[rank] for rank in ranked)
+
+    def suggest(self, query, k=10):
+        prefix = " ".join(query.casefold().split())
+        if not prefix:
+            return list(self.values[:k])
+        return list(self.lookup(prefix, k))
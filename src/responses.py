@@ -0,0 +1,187 @@
+import importlib.util
+import io
+import json
+import math
+import numpy as np
+from flask import Response, request
+
+# Response serialization for the prediction routes. JSON goes through orjson
+# when it is installed (it writes NumPy arrays directly, without building
+# Python lists of floats first), otherwise through the standard json module.
+# Responses whose shape never changes are Envelopes: the bytes around the one
+# variable value are rendered once at import time.
+#
+# Batch routes can also answer in MessagePack or Arrow IPC for high-volume
+# clients, chosen with ?format=msgpack|arrow or the Accept header. msgpack and
+# pyarrow come with requirements.txt but are optional at runtime: asking for a
+# format whose library isn't installed gets a 406.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Binary formats are only imported when a client first asks for them;
+# pyarrow alone adds a noticeable amount to startup
+def _installed(name):
+    return importlib.util.find_spec(name) is not None
+
+def _msgpack():
+    import msgpack
+    return msgpack
+
+def _pyarrow():
+    import pyarrow
+    import pyarrow.ipc
+    return pyarrow
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+MIMETYPES = {"json": JSON, "msgpack": MSGPACK, "arrow": ARROW}
+AVAILABLE = {"json": True, "msgpack": _installed("msgpack"), "arrow": _installed("pyarrow")}
+
+class UnsupportedFormat(ValueError):
+    pass
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        try:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # e.g. non-contiguous or object arrays, which orjson refuses
+            return json.dumps(obj, default=_default).encode()
+else:
+    def dumps(obj):
+        return json.dumps(obj, default=_default).encode()
+
+def json_response(obj, status=200):
+    return Response(dumps(obj), status=status, mimetype=JSON)
+
+def number(value):
+    # A float as JSON text; repr() is what json.dumps writes for finite floats
+    value = float(value)
+    return repr(value) if math.isfinite(value) else "null"
+
+class Envelope:
+    # A JSON object with one variable field. The static fields and the key
+    # are rendered once; render() only serializes the value.
+    def __init__(self, key, **static):
+        head = dumps(static)[:-1]
+        separator = b"," if static else b""
+        self.prefix = head + separator + dumps(key) + b":"
+        self.suffix = b"}"
+
+    def render(self, value):
+        return self.prefix + dumps(value) + self.suffix
+
+    def render_number(self, value):
+        return self.prefix + number(value).encode() + self.suffix
+
+    def response(self, value, status=200):
+        return Response(self.render(value), status=status, mimetype=JSON)
+
+    def number_response(self, value, status=200):
+        return Response(self.render_number(value), status=status, mimetype=JSON)
+
+def requested_format(default="json"):
+    # ?format= wins over the Accept header; */* and unknown types get JSON
+    name = request.args.get("format")
+    if name is None:
+        best = request.accept_mimetypes.best_match([MIMETYPES[default], MSGPACK, ARROW])
+        name = next((n for n, m in MIMETYPES.items() if m == best), default)
+    if name not in MIMETYPES:
+        raise UnsupportedFormat(f"Unknown format {name!r}; use one of {', '.join(MIMETYPES)}")
+    if not AVAILABLE[name]:
+        raise UnsupportedFormat(f"Format {name!r} is not available on this server")
+    return name
+
+def unsupported_format_response(error):
+    return json_response({"error": str(error), "formats": [n for n, ok in AVAILABLE.items() if ok]}, 406)
+
+def arrow_ipc(columns):
+    # columns: {name: 1-d array}; NumPy columns are handed to Arrow without copying
+    pyarrow = _pyarrow()
+    batch = pyarrow.RecordBatch.from_pydict(columns)
+    sink = io.BytesIO()
+    with pyarrow.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
+
+def columns_response(fmt, columns, extra=None):
+    # A batch result: {name: array, ...} plus scalar fields such as a count.
+    # Arrow carries only the columns; the row count is part of the stream.
+    extra = extra or {}
+    if fmt == "arrow":
+        return Response(arrow_ipc(columns), mimetype=ARROW)
+    if fmt == "msgpack":
+        payload = {name: np.asarray(values).tolist() for name, values in columns.items()}
+        payload.update(extra)
+        return Response(_msgpack().packb(payload), mimetype=MSGPACK)
+    payload = dict(columns)
+    payload.update(extra)
+    return json_response(payload)
+
+class RecordStream:
+    # Encodes a stream of record chunks (one dict of equal-length columns per
+    # chunk) as concatenated MessagePack maps, or as an Arrow IPC stream with
+    # one record batch per chunk. types ({name: "float64", "string", ...})
+    # fixes the Arrow schema so an all-null chunk doesn't change it.
+    #
+    # A stream that fails part way ends with fail(): one record holding only
+    # an "error" message, after which the Arrow stream is closed properly. The
+    # Arrow schema always has the nullable "error" column for this, so a
+    # client can tell a failed batch from a complete one.
+    def __init__(self, fmt, types):
+        self.fmt = fmt
+        self.mimetype = MIMETYPES[fmt]
+        self.types = dict(types, error="string")
+        self._schema = None
+        self._sink = None
+        self._writer = None
+
+    def encode(self, columns):
+        if self.fmt == "arrow":
+            pyarrow = _pyarrow()
+            if self._writer is None:
+                self._schema = pyarrow.schema([(name, getattr(pyarrow, t)()) for name, t in self.types.items()])
+                self._sink = io.BytesIO()
+                self._writer = pyarrow.ipc.new_stream(self._sink, self._schema)
+            length = len(next(iter(columns.values())))
+            columns = {name: columns.get(name, [None] * length) for name in self.types}
+            self._writer.write_batch(pyarrow.RecordBatch.from_pydict(columns, schema=self._schema))
+            return self._drain()
+
+        # None values are left out of the map, like the optional fields in JSON
+        names = list(columns)
+        rows = zip(*(np.asarray(columns[name]).tolist() for name in names))
+        packer = _msgpack().Packer()
+        return b"".join(packer.pack({n: v for n, v in zip(names, row) if v is not None}) for row in rows)
+
+    def close(self):
+        if self._writer is None:
+            return b""
+        self._writer.close()
+        self._writer = None
+        return self._drain()
+
+    def fail(self, message):
+        # The error record, plus the end of the Arrow stream
+        return self.encode({"error": [message]}) + self.close()
+
+    def _drain(self):
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
@@ -1,47 +1,62 @@
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+import hashlib
 import os
-import joblib
+import io
+import json
 import numpy as np
-from sklearn.preprocessing import OneHotEncoder
-import pickle
-import traceback
+import threading
+import time
+from micro_batcher import MicroBatcher
+from model_registry import registry
+from prediction_cache import prediction_cache, canonical_key
+from inference import RowBuffer, stack_rows
+from native_model import compiled
+from metrics import stage_seconds, predictions_total
+from dispatch import dispatcher
+from schema import Schema, Field, ValidationError
+from structured_log import log
+from prefix_index import PrefixIndex
+from single_flight import SingleFlight
+from responses import (Envelope, RecordStream, UnsupportedFormat, dumps, json_response, number,
+                       requested_format, unsupported_format_response)
 
 roanne_app = Flask(__name__, template_folder='../templates')
 
 # Ensure joblib does not cache to restricted directories
 os.environ["JOBLIB_TEMP_FOLDER"] = "/tmp"
 
-# Use absolute paths with __file__ for more reliable path resolution
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(current_dir)
-model_path_pkl = os.path.join(project_root, "artifacts", "used_car_price_model.pkl")
-model_path_joblib = os.path.join(project_root, "artifacts", "used_car_price_model.joblib")
-
-# Try loading the model
-try:
-    if os.path.exists(model_path_joblib):
-        model = joblib.load(model_path_joblib)
-        print("Car model loaded successfully from joblib")
-    elif os.path.exists(model_path_pkl):
-        with open(model_path_pkl, 'rb') as f:
-            model = pickle.load(f)
-        print("Car model loaded successfully from pickle")
-    else:
-        print(f"Car model file not found. Using fallback model.")
-        # Create a fallback model
-        class DummyModel:
-            def predict(self, X):
-                return np.array([10.0])  # Always predict 10 lakhs
-        
-        model = DummyModel()
-except Exception as e:
-    print(f"Car model loading failed: {e}")
-    model = None  # Set to None if loading fails
+# Fallback model used when no car model artifact is present
+class DummyModel:
+    def predict(self, X):
+        return np.full(len(X), 10.0)  # Always predict 10 lakhs
+
+def sample_input():
+    # Default vehicle, used to validate reloaded artifacts
+    return np.array([[default_values[col] for col in numerical_columns]], dtype=np.float64)
+
+# The model is loaded from artifacts/ on first use (the verified package if
+# there is one, then joblib, then pickle)
+registry.register("car", ["used_car_price_model.pkg", "used_car_price_model.joblib",
+                          "used_car_price_model.pkl"],
+                  fallback=DummyModel, sample=sample_input)
+
+def get_model():
+    return registry.get("car")
+
+# Metric children resolved once so recording stays cheap
+parse_timer = stage_seconds.labels(model="car", stage="parse")
+encode_timer = stage_seconds.labels(model="car", stage="encode")
+predict_timer = stage_seconds.labels(model="car", stage="predict")
+total_timer = stage_seconds.labels(model="car", stage="total")
+batch_timer = stage_seconds.labels(model="car", stage="batch_chunk")
+outcomes = {outcome: predictions_total.labels(model="car", outcome=outcome)
+            for outcome in ("model", "fallback", "cache_hit", "error")}
 
-# Create encoders for categorical variables
+# Collapses identical concurrent submissions (double clicks, clients polling a listing)
+flight = SingleFlight("car")
+
+# Categorical variables, one-hot encoded
 categorical_columns = ["Brand_Model", "Location", "Fuel_Type", "Transmission", "Owner_Type"]
-encoders = {col: OneHotEncoder(sparse=False, handle_unknown='ignore') for col in categorical_columns}
 
 # Define some common values for each categorical column
 common_values = {
@@ -52,108 +67,467 @@ common_values = {
     "Owner_Type": ["First", "Second", "Third", "Fourth"]
 }
 
-# Fit encoders with common values (this is just for initialization)
-for col in categorical_columns:
-    sample_data = pd.DataFrame({col: common_values[col]})
-    encoders[col].fit(sample_data)
+# Category ranking shipped next to the model, most common value first:
+# {"Brand_Model": [...], "Location": [...], ...}. Built from the training data
+# by scripts/build_car_vocabulary.py.
+VOCABULARY_FILE = "car_vocabulary.json"
+
+def _encoder_steps(model):
+    yield model
+    for _, step in getattr(model, "steps", []):
+        yield from _encoder_steps(step)
+    # ColumnTransformer's fitted parts
+    for _, step, _ in getattr(model, "transformers_", []):
+        if not isinstance(step, str):
+            yield from _encoder_steps(step)
+    inner = getattr(model, "transformer", None)
+    if inner is not None:
+        yield from _encoder_steps(inner)
+
+def model_categories(model):
+    # {column: categories} from the fitted encoders inside the car model: sklearn
+    # encoders fitted on a DataFrame (categories_ per feature_names_in_) and
+    # category_encoders' ordinal mappings. Empty when the model was trained on
+    # already-encoded columns, as the shipped artifact was.
+    found = {}
+    for step in _encoder_steps(model):
+        names = getattr(step, "feature_names_in_", None)
+        categories = getattr(step, "categories_", None)
+        if names is not None and categories is not None:
+            for name, values in zip(names, categories):
+                found.setdefault(str(name), [str(v) for v in values])
+        for mapping in getattr(getattr(step, "ordinal_encoder", step), "mapping", None) or []:
+            if isinstance(mapping, dict) and "col" in mapping and hasattr(mapping.get("mapping"), "index"):
+                values = [str(v) for v in mapping["mapping"].index if v is not None and v == v]
+                found.setdefault(str(mapping["col"]), values)
+    return {col: found[col] for col in categorical_columns if found.get(col)}
+
+def load_vocabulary(model=None):
+    # The model's own categories when it has encoders, else common_values; in
+    # both cases ranked by the shipped vocabulary file when there is one
+    vocabulary = {col: list(values) for col, values in common_values.items()}
+    known_to_model = model_categories(model) if model is not None else {}
+    vocabulary.update(known_to_model)
+    path = os.path.join(registry.artifacts_dir, VOCABULARY_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            shipped = json.load(f)
+        for col in categorical_columns:
+            values = [str(v) for v in shipped.get(col, [])]
+            if col in known_to_model:
+                # Only values the model knows, in the shipped order
+                allowed = set(known_to_model[col])
+                values = [v for v in values if v in allowed]
+            # Shipped order first (it carries the ranking), then everything it lacks
+            known = set(values)
+            vocabulary[col] = values + [v for v in vocabulary[col] if v not in known]
+    return vocabulary
+
+class CategoricalEncoding:
+    # Fitted encoders plus the precompiled lookup tables derived from them.
+    # pandas and sklearn are only imported when this is first built, so the
+    # pages and /check come up without the ML stack.
+    def __init__(self, model=None, source=None):
+        import pandas as pd
+        from sklearn.preprocessing import OneHotEncoder
+
+        # (fingerprint, loaded) of the car model when the vocabulary was read
+        self.source = source
+
+        # Create encoders for categorical variables
+        self.encoders = {col: OneHotEncoder(sparse=False, handle_unknown='ignore') for col in categorical_columns}
+
+        # Fit encoders with the category vocabulary
+        self.vocabulary = load_vocabulary(model)
+        for col in categorical_columns:
+            sample_data = pd.DataFrame({col: self.vocabulary[col]})
+            self.encoders[col].fit(sample_data)
+
+        # Precompiled lookup tables: category -> position in the one-hot block of the
+        # feature vector, built once from the fitted encoders' categories_
+        self.category_index = {}
+        self.encoded_feature_names = []
+        for col in categorical_columns:
+            encoder = self.encoders[col]
+            categories = encoder.categories_[0]
+            offset = len(self.encoded_feature_names)
+            self.category_index[col] = {value: offset + i for i, value in enumerate(categories)}
+            if hasattr(encoder, 'get_feature_names_out'):
+                self.encoded_feature_names.extend(encoder.get_feature_names_out([col]))
+            else:
+                # For older sklearn versions
+                self.encoded_feature_names.extend(f"{col}_{val}" for val in categories)
+
+        # Full feature vector layout: numerical features followed by the one-hot block
+        self.feature_names = numerical_columns + list(self.encoded_feature_names)
+        # Per-thread preallocated feature vector, reused across requests
+        self.buffer = RowBuffer(len(self.feature_names))
+        self.suggest_indexes = None
+        self.suggest_etag = None
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def get_encoding():
+    # Rebuilt when the car model changes, so the vocabulary follows the
+    # loaded artifact. A model that isn't loaded yet isn't loaded for this.
+    global _encoding
+    source = (registry.fingerprint("car"), registry.is_loaded("car"))
+    if _encoding is None or _encoding.source != source:
+        with _encoding_lock:
+            if _encoding is None or _encoding.source != source:
+                model = get_model() if source[1] else None
+                _encoding = CategoricalEncoding(model, source)
+    return _encoding
+
+def get_suggest_encoding():
+    # The current encoding with its suggestion indexes: one prefix index per
+    # categorical column, built once per encoding from the fitted encoders'
+    # categories_ (so every suggestion encodes to a real one-hot column),
+    # ranked by vocabulary order. The ETag names the ranked values, so it
+    # changes exactly when the suggestions can.
+    encoding = get_encoding()
+    if encoding.suggest_indexes is None:
+        ranked = {}
+        for col in categorical_columns:
+            rank = {value: i for i, value in enumerate(encoding.vocabulary[col])}
+            categories = sorted(encoding.encoders[col].categories_[0], key=lambda v: rank.get(v, len(rank)))
+            ranked[col] = [str(v) for v in categories]
+        encoding.suggest_etag = hashlib.sha256(json.dumps(ranked).encode()).hexdigest()[:32]
+        encoding.suggest_indexes = {col: PrefixIndex(values) for col, values in ranked.items()}
+    return encoding
+
+# Numerical features, in the order the model receives them
+numerical_columns = ["Year", "Kilometers_Driven", "Mileage", "Engine", "Power", "Seats"]
+
+# Every user input field, in a fixed order (used for cache keys)
+input_columns = categorical_columns + numerical_columns
+
+# Form field names used by roanne_car.html, mapped to the model's column names
+form_fields = {
+    "brand_model": "Brand_Model",
+    "location": "Location",
+    "year": "Year",
+    "kilometers_driven": "Kilometers_Driven",
+    "fuel_type": "Fuel_Type",
+    "transmission": "Transmission",
+    "owner_type": "Owner_Type",
+    "mileage": "Mileage",
+    "engine": "Engine",
+    "power": "Power",
+    "seats": "Seats"
+}
+
+# Defaults used when a field is missing (same as the single prediction route)
+default_values = {
+    "Brand_Model": common_values["Brand_Model"][0],
+    "Location": common_values["Location"][0],
+    "Year": 2015,
+    "Kilometers_Driven": 50000,
+    "Fuel_Type": common_values["Fuel_Type"][0],
+    "Transmission": common_values["Transmission"][0],
+    "Owner_Type": common_values["Owner_Type"][0],
+    "Mileage": 20,
+    "Engine": 1500,
+    "Power": 100,
+    "Seats": 5
+}
+
+# Types for each input; anything not listed here is a float
+input_types = {col: str for col in categorical_columns}
+input_types.update({"Year": int, "Seats": int})
+
+# Every field is optional and falls back to default_values
+CAR_SCHEMA = Schema([
+    Field(column, input_types.get(column, float), default=default_values[column], source=field)
+    for field, column in form_fields.items()
+])
+
+# Number of rows parsed and scored at a time in batch mode
+BATCH_CHUNK_SIZE = 2048
+
+num_numerical = len(numerical_columns)
+
+# Response bodies, rendered once; only the price is serialized per request
+PRICE_KEY = "Predicted Price (INR Lakhs)"
+PRICE = Envelope(PRICE_KEY)
+FALLBACK_PRICE = Envelope(PRICE_KEY, note="Using fallback prediction")
+DEFAULT_PRICE_BODY = dumps({PRICE_KEY: 10.0, "note": "Using default prediction due to model issues"})
+
+# Column types for the msgpack/Arrow batch streams
+BATCH_TYPES = {PRICE_KEY: "float64", "note": "string"}
+
+def feature_vector(encoding):
+    return encoding.buffer.get()
+
+def encode_input(user_input):
+    # Writes numerical values and one-hot flags straight into the feature vector.
+    # Unknown categories leave their block all zeros, like handle_unknown='ignore'.
+    encoding = get_encoding()
+    vector = feature_vector(encoding)
+    row = vector[0]
+    for i, col in enumerate(numerical_columns):
+        row[i] = user_input[col]
+    row[num_numerical:] = 0.0
+    for col in categorical_columns:
+        index = encoding.category_index[col].get(user_input[col])
+        if index is not None:
+            row[num_numerical + index] = 1.0
+    return vector
+
+def fallback_price(year, kilometers_driven):
+    # Works on scalars and on whole columns
+    base_value = 15.0  # Base value in lakhs
+    year_factor = (year - 2010) * 0.5  # 0.5 lakhs per year after 2010
+    mileage_discount = kilometers_driven / 10000 * 0.2  # 0.2 lakhs per 10k km
+    return np.maximum(base_value + year_factor - mileage_discount, 1.0)  # Minimum price of 1 lakh
+
+def prepare_frame(raw_df):
+    # Accept either the form field names or the model column names
+    df = raw_df.rename(columns=form_fields)
+    for col, default in default_values.items():
+        if col not in df.columns:
+            df[col] = default
+        else:
+            df[col] = df[col].fillna(default)
+    return df
+
+def encode_frame(df):
+    # Feature matrix for model input, one row per vehicle
+    return df[numerical_columns].to_numpy(dtype=np.float64)
+
+def predict_chunk(df):
+    input_data = encode_frame(df)
+    model = get_model()
+    if model is not None:
+        try:
+            return (compiled(model, sample_input) or model).predict(input_data), None
+        except Exception as model_e:
+            log.warning("model_failed", model="car", batch=True, fallback=True, exc=model_e)
+
+    prices = fallback_price(input_data[:, 0], input_data[:, 1])
+    return prices, "Using fallback prediction"
+
+def predict_rows(rows):
+    # One vectorized predict for a group of concurrent single-vehicle requests
+    model = get_model()
+    # The flattened native model when the estimator supports it, sklearn otherwise
+    return (compiled(model, sample_input) or model).predict(stack_rows(rows))
+
+# Groups concurrent /predict requests into one predict call
+batcher = MicroBatcher.from_env(predict_rows)
+
+def iter_batch_chunks():
+    # Inventory lists can arrive as a file upload or as a raw request body
+    if 'file' in request.files:
+        upload = request.files['file']
+        stream = upload.stream
+        is_ndjson = upload.filename.endswith(('.ndjson', '.jsonl'))
+    else:
+        stream = request.stream
+        is_ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+
+    import pandas as pd
+
+    def validated(rows, start):
+        return pd.DataFrame(CAR_SCHEMA.validate_batch(rows, start), columns=CAR_SCHEMA.names)
+
+    if not is_ndjson:
+        # Cells are read as text so the schema coerces them the same way as
+        # form and NDJSON values; empty cells take the field's default
+        start = 0
+        for chunk in pd.read_csv(stream, chunksize=BATCH_CHUNK_SIZE, dtype=str, keep_default_na=False):
+            yield validated(chunk.to_dict('records'), start)
+            start += len(chunk)
+        return
+
+    rows = []
+    start = 0
+    for line in io.TextIOWrapper(stream, encoding='utf-8'):
+        if line.strip():
+            rows.append(json.loads(line))
+        if len(rows) == BATCH_CHUNK_SIZE:
+            yield validated(rows, start)
+            start += len(rows)
+            rows = []
+    if rows:
+        yield validated(rows, start)
 
 @roanne_app.route('/')
 def home():
     return render_template('roanne_car.html')
 
-@roanne_app.route('/predict', methods=['POST'])
-def predict():
+def parse_form(form):
+    started = time.perf_counter()
+    # Gather user input, filling defaults and coercing types in one pass
+    user_input = CAR_SCHEMA.validate(form)
+    parse_timer.observe(time.perf_counter() - started)
+    return user_input
+
+def score_input(user_input, cache_key):
+    # Encodes and scores one parsed input and caches the result. Returns None
+    # when even the fallback failed; encoding errors propagate.
+    started = time.perf_counter()
+
+    # Encode numerical and categorical features in one pass
+    vector = encode_input(user_input)
+
+    # The model is fed the numerical part of the feature vector
+    input_data = vector[:, :num_numerical]
+    encoded = time.perf_counter()
+    encode_timer.observe(encoded - started)
+    
+    # Make prediction
     try:
-        # Gather user input
-        user_input = {
-            "Brand_Model": request.form.get('brand_model', common_values["Brand_Model"][0]),
-            "Location": request.form.get('location', common_values["Location"][0]),
-            "Year": int(request.form.get('year', 2015)),
-            "Kilometers_Driven": float(request.form.get('kilometers_driven', 50000)),
-            "Fuel_Type": request.form.get('fuel_type', common_values["Fuel_Type"][0]),
-            "Transmission": request.form.get('transmission', common_values["Transmission"][0]),
-            "Owner_Type": request.form.get('owner_type', common_values["Owner_Type"][0]),
-            "Mileage": float(request.form.get('mileage', 20)),
-            "Engine": float(request.form.get('engine', 1500)),
-            "Power": float(request.form.get('power', 100)),
-            "Seats": int(request.form.get('seats', 5))
-        }
-        
-        # Create a base DataFrame
-        df = pd.DataFrame([user_input])
-        
-        # Create encoded features for categorical columns
-        encoded_features = {}
-        for col in categorical_columns:
-            # Extract this categorical value and reshape for encoding
-            cat_value = df[[col]]
-            
-            # Encode the categorical value
-            encoded = encoders[col].transform(cat_value)
-            
-            # Get feature names (column names after encoding)
-            if hasattr(encoders[col], 'get_feature_names_out'):
-                feature_names = encoders[col].get_feature_names_out([col])
-            else:
-                # For older sklearn versions
-                feature_names = [f"{col}_{val}" for val in encoders[col].categories_[0]]
-            
-            # Add to encoded features
-            for i, name in enumerate(feature_names):
-                encoded_features[name] = encoded[0][i]
+        result = None
+        # Check if we have a loaded model
+        if get_model() is not None:
+            try:
+                # Use model for prediction
+                prediction = batcher.submit(input_data[0])
+                predict_timer.observe(time.perf_counter() - encoded)
+                result = {PRICE_KEY: round(prediction, 2)}
+                outcomes["model"].inc()
+            except Exception as model_e:
+                log.warning("model_failed", model="car", fallback=True, exc=model_e)
         
-        # Create numerical features
-        numerical_features = {
-            "Year": user_input["Year"],
-            "Kilometers_Driven": user_input["Kilometers_Driven"],
-            "Mileage": user_input["Mileage"],
-            "Engine": user_input["Engine"],
-            "Power": user_input["Power"],
-            "Seats": user_input["Seats"]
-        }
-        
-        # Combine all features
-        all_features = {**numerical_features, **encoded_features}
-        
-        # Convert to feature vector for model input
-        input_data = np.array([list(numerical_features.values())])
-        
-        # Make prediction
-        try:
-            # Check if we have a loaded model
-            if model is not None:
-                try:
-                    # Use model for prediction
-                    prediction = model.predict(input_data)[0]
-                    return jsonify({"Predicted Price (INR Lakhs)": round(prediction, 2)})
-                except Exception as model_e:
-                    print(f"Model prediction failed: {model_e}, using fallback")
-            
-            # Fall back to a simpler prediction 
-            base_value = 15.0  # Base value in lakhs
-            year_factor = (user_input["Year"] - 2010) * 0.5  # 0.5 lakhs per year after 2010
-            mileage_discount = user_input["Kilometers_Driven"] / 10000 * 0.2  # 0.2 lakhs per 10k km
-            
-            prediction = base_value + year_factor - mileage_discount
-            prediction = max(prediction, 1.0)  # Minimum price of 1 lakh
-            
-            return jsonify({"Predicted Price (INR Lakhs)": round(prediction, 2),
-                           "note": "Using fallback prediction"})
-        except Exception as inner_e:
-            print(f"Prediction error: {inner_e}")
-            return jsonify({"Predicted Price (INR Lakhs)": round(10.0, 2), 
-                           "note": "Using default prediction due to model issues"})
+        if result is None:
+            # Fall back to a simpler prediction, the same one the batch route uses
+            prediction = float(fallback_price(user_input["Year"], user_input["Kilometers_Driven"]))
+            result = {PRICE_KEY: round(prediction, 2),
+                      "note": "Using fallback prediction"}
+            outcomes["fallback"].inc()
+        else:
+            # Only real model outputs are cached; a fallback answers this request only
+            prediction_cache.put(cache_key, result)
+        return result
+    except Exception as inner_e:
+        log.error("prediction_error", model="car", exc=inner_e)
+        outcomes["fallback"].inc()
+        return None
+
+def predict_input(user_input):
+    # Scores an already parsed user_input dict
+    started = time.perf_counter()
+    try:
+        # Repeated submissions are answered from the cache. The model is
+        # loaded first so the key carries its fingerprint, not None.
+        get_model()
+        cache_key = canonical_key("car", registry.fingerprint("car"), input_columns, user_input)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            outcomes["cache_hit"].inc()
+            total_timer.observe(time.perf_counter() - started)
+            return json_response(cached)
+
+        # Identical submissions already being scored wait for that result,
+        # unless it is a fallback: then each of them tries the model itself
+        result, _ = flight.do(cache_key, lambda: score_input(user_input, cache_key),
+                              shareable=lambda result: result is not None and "note" not in result)
+        if result is None:
+            return Response(DEFAULT_PRICE_BODY, mimetype="application/json")
+        total_timer.observe(time.perf_counter() - started)
+        envelope = FALLBACK_PRICE if "note" in result else PRICE
+        return envelope.number_response(result[PRICE_KEY])
             
     except Exception as e:
-        print(f"Overall prediction route error: {e}")
+        log.error("route_error", route="car_predict", exc=e)
+        outcomes["error"].inc()
+        return jsonify({"error": str(e)})
+
+@roanne_app.route('/predict', methods=['POST'])
+def predict():
+    try:
+        user_input = parse_form(request.form)
+    except ValidationError as e:
+        outcomes["error"].inc()
+        return jsonify({"error": str(e), "fields": e.errors})
+    except Exception as e:
+        log.error("route_error", route="car_predict", exc=e)
+        outcomes["error"].inc()
         return jsonify({"error": str(e)})
+    return predict_input(user_input)
+
+# Lets main_app's /predict route requests with car form fields here. Car is
+# checked before wheat, as /predict always has.
+dispatcher.register("car", CAR_SCHEMA.source_keys(), parse_form, predict_input,
+                    triggers=("year", "kilometers_driven", "brand_model"), priority=10)
+
+@roanne_app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    # NDJSON by default; ?format=msgpack|arrow or the Accept header for bulk clients
+    try:
+        fmt = requested_format()
+    except UnsupportedFormat as e:
+        return unsupported_format_response(e)
+    stream = RecordStream(fmt, BATCH_TYPES) if fmt != "json" else None
+
+    def encode_json(prices, note):
+        # One pre-rendered line per vehicle, joined into one write per chunk
+        envelope = FALLBACK_PRICE if note else PRICE
+        prefix, suffix = envelope.prefix, envelope.suffix + b"\n"
+        return b"".join(prefix + number(price).encode() + suffix for price in prices)
+
+    def generate():
+        try:
+            for raw_df in iter_batch_chunks():
+                chunk_started = time.perf_counter()
+                prices, note = predict_chunk(prepare_frame(raw_df))
+                batch_timer.observe(time.perf_counter() - chunk_started)
+                outcomes["fallback" if note else "model"].inc(len(prices))
+                prices = [round(price, 2) for price in np.asarray(prices, dtype=np.float64).tolist()]
+                if stream is None:
+                    yield encode_json(prices, note)
+                else:
+                    yield stream.encode({PRICE_KEY: prices, "note": [note] * len(prices)})
+            if stream is not None:
+                yield stream.close()
+        except Exception as e:
+            log.error("route_error", route="car_predict_batch", exc=e)
+            if stream is None:
+                yield dumps({"error": str(e)}) + b"\n"
+            else:
+                # Ends with an error record so the client can't take it for a complete batch
+                yield stream.fail(str(e))
+
+    # Stream one record per vehicle so memory stays flat for large uploads
+    mimetype = 'application/x-ndjson' if stream is None else stream.mimetype
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+# Autocomplete for the categorical form fields: /suggest?field=brand_model&q=mar&k=10
+SUGGEST_MAX_K = 50
+
+@roanne_app.route('/suggest')
+def suggest():
+    field = request.args.get("field", "brand_model")
+    column = form_fields.get(field, field)
+    if column not in categorical_columns:
+        fields = [f for f, col in form_fields.items() if col in categorical_columns]
+        return jsonify({"error": f"field must be one of {', '.join(fields)}"}), 400
+    try:
+        k = min(max(int(request.args.get("k", 10)), 1), SUGGEST_MAX_K)
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+
+    # The vocabulary follows the loaded car model, which a hot reload can swap
+    # at any time: clients revalidate every time and get an empty 304 while
+    # it is unchanged
+    encoding = get_suggest_encoding()
+    if request.if_none_match.contains_weak(encoding.suggest_etag):
+        response = Response(status=304)
+    else:
+        suggestions = encoding.suggest_indexes[column].suggest(request.args.get("q", ""), k)
+        response = json_response({"field": field, "suggestions": suggestions})
+    response.set_etag(encoding.suggest_etag)
+    response.headers["Cache-Control"] = "public, no-cache"
+    return response
 
 # Add a route to check if the app is working
 @roanne_app.route('/check')
 def check():
     return jsonify({
         "status": "Car app is working",
-        "model_loaded": model is not None
+        "model_loaded": registry.is_loaded("car")
     })
 
 if __name__ == '__main__':
@@ -0,0 +1,109 @@
+# Declarative input schemas for the prediction payloads. A Schema is built
+# once per model from its Field list and compiled into a flat plan, so
+# validating a payload is one loop that fills defaults, coerces types and
+# collects every field error before raising, for single payloads and for
+# batches alike. No pandas is involved.
+
+REQUIRED = object()
+_MISSING = object()
+
+class ValidationError(ValueError):
+    def __init__(self, errors):
+        # errors: {field: message}; batch errors are keyed "row <i>: <field>"
+        self.errors = errors
+        super().__init__("Invalid input: " + "; ".join(f"{k}: {v}" for k, v in errors.items()))
+
+def _to_int(value):
+    # int("2018") works, int(2018.0) works, int("2018.0") does not
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            return int(value)
+        except ValueError:
+            as_float = float(value)
+            if not as_float.is_integer():
+                raise
+            return int(as_float)
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{value!r} is not a whole number")
+    return int(value)
+
+_COERCE = {
+    int: _to_int,
+    float: float,
+    str: str
+}
+
+class Field:
+    def __init__(self, name, type=float, default=REQUIRED, source=None, lenient=False):
+        # name: column name the model uses; source: form/JSON key (defaults to name)
+        # lenient: a value that can't be coerced falls back to the default
+        self.name = name
+        self.type = type
+        self.default = default
+        self.source = source or name
+        self.lenient = lenient
+
+class Schema:
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.names = [f.name for f in self.fields]
+        # Compiled plan: (name, keys to look up, coerce, default, lenient, type name).
+        # Defaults are coerced up front so they have the field's type.
+        self._plan = tuple(
+            (f.name,
+             (f.source,) if f.source == f.name else (f.source, f.name),
+             _COERCE[f.type],
+             f.default if f.default is REQUIRED else _COERCE[f.type](f.default),
+             f.lenient, f.type.__name__)
+            for f in self.fields
+        )
+
+    def source_keys(self):
+        return [f.source for f in self.fields]
+
+    def _check(self, data, errors, prefix):
+        values = {}
+        for name, keys, coerce, default, lenient, type_name in self._plan:
+            raw = _MISSING
+            for key in keys:
+                if key in data:
+                    raw = data[key]
+                    break
+
+            if raw is _MISSING or raw is None or raw == "":
+                if default is REQUIRED:
+                    errors[prefix + name] = "required"
+                else:
+                    values[name] = default
+                continue
+
+            try:
+                values[name] = coerce(raw)
+            except (TypeError, ValueError, OverflowError):
+                if lenient and default is not REQUIRED:
+                    values[name] = default
+                else:
+                    errors[prefix + name] = f"expected {type_name}, got {raw!r}"
+        return values
+
+    def validate(self, data):
+        # data: any mapping (request.form, a JSON object, a dict)
+        errors = {}
+        values = self._check(data, errors, "")
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+    def validate_batch(self, rows, start=0):
+        # start: number of the first row, for batches read in chunks
+        errors = {}
+        results = []
+        for i, row in enumerate(rows, start):
+            if not isinstance(row, dict):
+                errors[f"row {i}"] = "expected an object"
+                continue
+            results.append(self._check(row, errors, f"row {i}: "))
+        if errors:
+            raise ValidationError(errors)
+        return results
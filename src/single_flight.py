@@ -0,0 +1,92 @@
+import threading
+from metrics import metrics
+
+# Collapses identical concurrent predictions into one computation. The first
+# request for a key (the leader) runs it; requests for the same key that
+# arrive while it is running (followers) wait for it and share its result.
+# Nothing is kept once the leader finishes: the prediction cache answers later
+# repeats, so the leader stores its result there before letting the followers
+# go.
+#
+# A failure is not shared. When the leader raises, or its result isn't
+# shareable (e.g. a fallback price given because the model call failed), each
+# follower runs the computation itself, as it would have without collapsing:
+# the failure may have been transient.
+#
+# Keys are the prediction cache keys (model, artifact hash and the canonical
+# feature vector), so "2018" and 2018.0 collapse too. Exported on /metrics as
+# prediction_flights_total{role="leader|follower|retry"}, where retries are
+# followers that ran on their own after a failed leader. The collapse rate is
+# (followers - retries) / (leaders + followers).
+
+class _Call:
+    __slots__ = ("done", "value", "error", "shareable")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.shareable = False
+
+class SingleFlight:
+    def __init__(self, model):
+        self.model = model
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.retries = 0
+        _flights.append(self)
+
+    def do(self, key, fn, shareable=None):
+        # Returns (fn's result, shared); shared is True for followers that got
+        # the leader's result. shareable(result) says whether a successful
+        # result may be handed to the followers (default: always).
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            call.done.wait()
+            if call.shareable:
+                return call.value, True
+            with self._lock:
+                self.retries += 1
+            return fn(), False
+
+        try:
+            call.value = fn()
+            call.shareable = shareable is None or shareable(call.value)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+_flights = []
+
+def collect_flight_metrics():
+    flights = list(_flights)
+    return [
+        ("prediction_flights_total", "counter",
+         "Predictions that ran (leader) or waited on an identical one in flight (follower)",
+         [({"model": f.model, "role": role}, getattr(f, role + "s")) for f in flights
+          for role in ("leader", "follower")] +
+         [({"model": f.model, "role": "retry"}, f.retries) for f in flights]),
+        ("prediction_flights_in_progress", "gauge", "Distinct predictions being computed right now",
+         [({"model": f.model}, f.in_flight()) for f in flights])
+    ]
+
+metrics.register_collector(collect_flight_metrics)
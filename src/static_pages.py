@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import os
+from flask import Response, render_template, request
+from structured_log import log
+
+# The UI pages (home, wheat and car forms) have no per-request content, so
+# they are rendered once when the app starts and served from memory. Each page
+# keeps its identity, gzip and (when the brotli package is installed) brotli
+# bodies, picked by Accept-Encoding, plus a strong ETag per encoding derived
+# from the rendered HTML. A request whose If-None-Match carries any of them
+# gets an empty 304. Page loads never touch Jinja.
+#
+# Identity is acceptable unless the client refuses it (identity;q=0, or *;q=0
+# without naming identity); a client that refuses every encoding the page has
+# gets a 406.
+#
+# PRERENDER_PAGES=0 renders on every request instead (for editing templates);
+# PAGE_CACHE_CONTROL overrides the Cache-Control header. The default lets
+# browsers keep the page but revalidate it, which costs a 304 after a deploy
+# changes nothing and picks up new HTML immediately when it does.
+
+PRERENDER = os.environ.get("PRERENDER_PAGES", "1") != "0"
+CACHE_CONTROL = os.environ.get("PAGE_CACHE_CONTROL", "public, no-cache")
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressed bodies are only kept when they are smaller than this fraction
+MIN_SAVING = 0.9
+
+class Page:
+    def __init__(self, html):
+        body = html.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {"identity": body}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body) * MIN_SAVING:
+                self.bodies[encoding] = data
+        # A strong ETag names one exact byte sequence, so each encoding has its own
+        self.etags = {encoding: digest if encoding == "identity" else f"{digest}-{encoding}"
+                      for encoding in self.bodies}
+        # Preferred first when the client accepts several equally
+        self.offered = [e for e in ("br", "gzip") if e in self.bodies]
+
+    def negotiate(self):
+        # The acceptable encoding with the highest q; ties go to the smaller
+        # body. None when the client accepts none of them.
+        qualities = {value.lower(): quality for value, quality in request.accept_encodings}
+        wildcard = qualities.get("*")
+        best, best_quality = None, 0
+        for encoding in self.offered + ["identity"]:
+            quality = qualities.get(encoding, wildcard)
+            if quality is None:
+                quality = 1 if encoding == "identity" else 0
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def not_modified(self):
+        # Any of the page's tags means the client has the current HTML
+        tags = request.if_none_match
+        return bool(tags) and (tags.star_tag or any(tags.contains_weak(t) for t in self.etags.values()))
+
+    def response(self):
+        encoding = self.negotiate()
+        if encoding is None:
+            response = Response(f"Available encodings: {', '.join(self.offered + ['identity'])}\n",
+                                status=406, mimetype="text/plain")
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+        if self.not_modified():
+            response = Response(status=304)
+        else:
+            response = Response(self.bodies[encoding], mimetype="text/html")
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(self.etags[encoding])
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+def render_pages(app, templates):
+    # templates: {page name: template file}. A page that fails to render is
+    # left out and keeps being rendered per request.
+    pages = {}
+    with app.app_context():
+        for name, template in templates.items():
+            try:
+                pages[name] = Page(render_template(template))
+            except Exception as e:
+                log.error("page_prerender_failed", page=name, template=template, exc=e)
+    return pages
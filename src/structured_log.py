@@ -0,0 +1,169 @@
+import atexit
+import json
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from metrics import metrics
+
+# Structured, non-blocking logging for the request path. log.info(...) and
+# friends only append a tuple to a bounded in-memory buffer; a background
+# thread drains it every LOG_FLUSH_INTERVAL seconds (or sooner when it is half
+# full), formats the records as JSON lines and writes them in one call to
+# LOG_FILE or stdout. Request threads never wait on a write.
+#
+# When the buffer is full new records are dropped and counted instead of
+# blocking. Records logged with sampled=True (the per-request access log) are
+# kept with probability LOG_SAMPLE_RATE. Exceptions are stored as objects and
+# their tracebacks formatted by the flush thread, off the request path.
+# The counters are exported on /metrics as log_records_total.
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+try:
+    import orjson
+
+    def _dumps(record):
+        return orjson.dumps(record, default=str)
+except ImportError:
+    def _dumps(record):
+        return json.dumps(record, default=str).encode()
+
+class StructuredLogger:
+    def __init__(self, path=None, capacity=8192, flush_interval=0.5, sample_rate=1.0, level="info"):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.level = LEVELS[level]
+        self.counts = {"emitted": 0, "sampled_out": 0, "dropped": 0, "written": 0, "write_errors": 0}
+        self._reset()
+        # Records buffered before a fork belong to the parent; the child starts empty
+        os.register_at_fork(before=self.flush, after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls):
+        return cls(path=os.environ.get("LOG_FILE") or None,
+                   capacity=int(os.environ.get("LOG_BUFFER_SIZE", 8192)),
+                   flush_interval=float(os.environ.get("LOG_FLUSH_INTERVAL", 0.5)),
+                   sample_rate=float(os.environ.get("LOG_SAMPLE_RATE", 1.0)),
+                   level=os.environ.get("LOG_LEVEL", "info").lower())
+
+    def _reset(self):
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._file = None
+        self._flusher_pid = None
+
+    def log(self, level, event, exc=None, sampled=False, **fields):
+        if LEVELS[level] < self.level:
+            return
+        if sampled and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            with self._lock:
+                self.counts["sampled_out"] += 1
+            return
+
+        record = (time.time(), level, event, fields, exc)
+        with self._lock:
+            if len(self._buffer) >= self.capacity:
+                self.counts["dropped"] += 1
+                return
+            self._buffer.append(record)
+            self.counts["emitted"] += 1
+            size = len(self._buffer)
+
+        # Threads don't survive fork, so each worker starts its own flusher
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+        if size >= self.capacity // 2:
+            self._wake.set()
+
+    def debug(self, event, **fields):
+        self.log("debug", event, **fields)
+
+    def info(self, event, **fields):
+        self.log("info", event, **fields)
+
+    def warning(self, event, **fields):
+        self.log("warning", event, **fields)
+
+    def error(self, event, **fields):
+        self.log("error", event, **fields)
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        thread = threading.Thread(target=self._run, name="log-flush", daemon=True)
+        thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _format(self, record):
+        ts, level, event, fields, exc = record
+        out = {"ts": round(ts, 6), "level": level, "event": event, "pid": os.getpid()}
+        out.update(fields)
+        if exc is not None:
+            out["error"] = str(exc)
+            out["error_type"] = type(exc).__name__
+            if level == "error" and exc.__traceback__ is not None:
+                out["traceback"] = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+        return out
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            records, self._buffer = self._buffer, deque()
+
+        data = b"".join(_dumps(self._format(record)) + b"\n" for record in records)
+        with self._write_lock:
+            try:
+                self._write(data)
+                written, failed = len(records), 0
+            except (OSError, ValueError):
+                written, failed = 0, len(records)
+        with self._lock:
+            self.counts["written"] += written
+            self.counts["write_errors"] += failed
+
+    def _write(self, data):
+        if self.path:
+            if self._file is None:
+                self._file = open(self.path, "ab", buffering=0)
+            self._file.write(data)
+            return
+        stream = sys.stdout
+        if hasattr(stream, "buffer"):
+            stream.buffer.write(data)
+        else:
+            stream.write(data.decode("utf-8"))
+        stream.flush()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, buffered=len(self._buffer), capacity=self.capacity)
+
+# Shared by every module in the process
+log = StructuredLogger.from_env()
+
+def collect_log_metrics():
+    stats = log.stats()
+    return [
+        ("log_records_total", "counter", "Log records by outcome",
+         [({"outcome": outcome}, stats[outcome]) for outcome in log.counts]),
+        ("log_buffer_records", "gauge", "Log records waiting to be written", [({}, stats["buffered"])])
+    ]
+
+metrics.register_collector(collect_log_metrics)
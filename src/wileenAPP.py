@@ -1,70 +1,233 @@
 
-import pickle
 import numpy as np
 import os
-import pandas as pd
+import io
+import time
 from flask import Flask, request, jsonify, render_template
+from micro_batcher import MicroBatcher
+from model_registry import registry
+from prediction_cache import prediction_cache, canonical_key
+from inference import needs_column_names, RowBuffer, stack_rows
+from native_model import compiled
+from metrics import stage_seconds, predictions_total
+from dispatch import dispatcher
+from schema import Schema, Field, ValidationError
+from structured_log import log
+from single_flight import SingleFlight
+from responses import (Envelope, UnsupportedFormat, requested_format, columns_response,
+                       unsupported_format_response)
 
 # Initialize Flask app
 wileen_app = Flask(__name__, template_folder='templates')
 
-# Load the trained model
+def sample_input():
+    # A typical kernel, used to validate reloaded artifacts
+    import pandas as pd
+    return build_features(pd.DataFrame([{
+        'Area': 14.8, 'Perimeter': 14.6, 'Compactness': 0.87, 'Length': 5.6,
+        'Width': 3.26, 'AsymmetryCoeff': 3.7, 'Groove': 5.4
+    }]))
+
+# The trained model is loaded from artifacts/ on first use
+registry.register('wheat', ['seed_pipeline.pkg', 'seed_pipeline.pkl'], sample=sample_input)
+
 def load_model():
-    try:
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        model_path = os.path.join(project_root, 'artifacts', 'seed_pipeline.pkl')
-        if os.path.exists(model_path):
-            with open(model_path, 'rb') as model_file:
-                return pickle.load(model_file)
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        return None
+    return registry.get('wheat')
+
+# Metric children resolved once so recording stays cheap
+parse_timer = stage_seconds.labels(model='wheat', stage='parse')
+predict_timer = stage_seconds.labels(model='wheat', stage='predict')
+total_timer = stage_seconds.labels(model='wheat', stage='total')
+batch_parse_timer = stage_seconds.labels(model='wheat', stage='batch_parse')
+batch_predict_timer = stage_seconds.labels(model='wheat', stage='batch_predict')
+outcomes = {outcome: predictions_total.labels(model='wheat', outcome=outcome)
+            for outcome in ('model', 'cache_hit', 'error')}
+
+# Collapses identical concurrent submissions into one model call
+flight = SingleFlight('wheat')
+
+# Column order the seed pipeline was trained on
+FEATURE_COLUMNS = ['Area', 'Perimeter', 'Compactness', 'Length', 'Width',
+                   'AsymmetryCoeff', 'Groove', 'Length_Width_Ratio']
+
+# Form field names used by wheat.html, mapped to the model's column names
+FORM_FIELDS = {
+    'area': 'Area',
+    'perimeter': 'Perimeter',
+    'compactness': 'Compactness',
+    'length': 'Length',
+    'width': 'Width',
+    'asymmetry_coeff': 'AsymmetryCoeff',
+    'groove': 'Groove'
+}
+
+# Every form field is a required number
+WHEAT_SCHEMA = Schema([Field(column, float, source=field) for field, column in FORM_FIELDS.items()])
+
+# Number of rows scored per model.predict call in batch mode
+BATCH_CHUNK_SIZE = 4096
+
+# {"prediction": <class>}, with everything but the class rendered once
+PREDICTION = Envelope('prediction')
+
+def build_features(raw_df):
+    # Accept either the form field names or the model column names
+    df = raw_df.rename(columns=FORM_FIELDS)
+    missing = [col for col in FORM_FIELDS.values() if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    df = df[list(FORM_FIELDS.values())].astype(float)
+
+    # Same rule as process_form (ratio is 0 when width is 0), for all rows at once
+    length = df['Length'].to_numpy()
+    width = df['Width'].to_numpy()
+    df['Length_Width_Ratio'] = np.divide(length, width, out=np.zeros_like(length), where=width != 0)
+    return df[FEATURE_COLUMNS]
+
+def predict_frame(features_df):
+    model = load_model()
+    # The flattened native model when the pipeline supports it, sklearn otherwise
+    model = compiled(model, sample_input) or model
+    # Class labels as one int64 array, serialized without a list of Python ints
+    predictions = np.empty(len(features_df), dtype=np.int64)
+    for start in range(0, len(features_df), BATCH_CHUNK_SIZE):
+        chunk = features_df.iloc[start:start + BATCH_CHUNK_SIZE]
+        predictions[start:start + len(chunk)] = model.predict(chunk)
+    return predictions
+
+# Preallocated float64 row for single predictions, in FEATURE_COLUMNS order
+row_buffer = RowBuffer(len(FEATURE_COLUMNS))
+
+def predict_rows(rows):
+    # One vectorized predict for a group of concurrent single-sample requests
+    model = load_model()
+    native = compiled(model, sample_input)
+    if native is not None:
+        return native.predict(stack_rows(rows))
+    if needs_column_names(model):
+        import pandas as pd
+        return model.predict(pd.DataFrame(stack_rows(rows), columns=FEATURE_COLUMNS))
+    return model.predict(stack_rows(rows))
+
+# Groups concurrent /process requests into one predict call
+batcher = MicroBatcher.from_env(predict_rows)
+
+def read_batch_request():
+    # pandas is imported on first use so the pages come up without it
+    import pandas as pd
+
+    # CSV can arrive as a file upload or as a raw text/csv body
+    if 'file' in request.files:
+        return pd.read_csv(request.files['file'])
+    if request.mimetype == 'text/csv':
+        return pd.read_csv(io.BytesIO(request.get_data()))
 
-# Load model at startup
-model = load_model()
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('samples')
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of samples or a CSV upload")
+    return pd.DataFrame(WHEAT_SCHEMA.validate_batch(data), columns=WHEAT_SCHEMA.names)
 
 @wileen_app.route('/', methods=['GET'])
 def home_page():
     return render_template('wheat.html')
 
+def parse_form(form):
+    started = time.perf_counter()
+    values = WHEAT_SCHEMA.validate(form)
+    length = values['Length']
+    width = values['Width']
+    length_width_ratio = length / width if width != 0 else 0
+
+    features = [values[column] for column in WHEAT_SCHEMA.names]
+    features.append(length_width_ratio)
+    parse_timer.observe(time.perf_counter() - started)
+    return features
+
+def score_features(features, cache_key):
+    # Scores one feature list and caches the class
+    predict_started = time.perf_counter()
+    row = row_buffer.get()
+    row[0] = features
+    prediction = int(batcher.submit(row[0]))
+    predict_timer.observe(time.perf_counter() - predict_started)
+    prediction_cache.put(cache_key, prediction)
+    outcomes['model'].inc()
+    return prediction
+
+def predict_features(features):
+    # Scores an already parsed feature list (FEATURE_COLUMNS order)
+    started = time.perf_counter()
+    if load_model() is None:
+        outcomes['error'].inc()
+        return jsonify({"error": "Model not loaded"})
+
+    try:
+        # Repeated submissions are answered from the cache
+        cache_key = canonical_key('wheat', registry.fingerprint('wheat'), FEATURE_COLUMNS, features)
+        prediction = prediction_cache.get(cache_key)
+        if prediction is None:
+            # Identical submissions already being scored wait for that result
+            prediction, _ = flight.do(cache_key, lambda: score_features(features, cache_key))
+        else:
+            outcomes['cache_hit'].inc()
+        total_timer.observe(time.perf_counter() - started)
+        return PREDICTION.response(prediction)
+    except Exception as e:
+        outcomes['error'].inc()
+        return jsonify({"error": str(e)})
+
 @wileen_app.route('/process', methods=['POST'])
 def process_form():
-    if model is None:
+    if load_model() is None:
+        outcomes['error'].inc()
         return jsonify({"error": "Model not loaded"})
 
     try:
-        area = float(request.form['area'])
-        perimeter = float(request.form['perimeter'])
-        compactness = float(request.form['compactness'])
-        length = float(request.form['length'])
-        width = float(request.form['width'])
-        asymmetry_coeff = float(request.form['asymmetry_coeff'])
-        groove = float(request.form['groove'])
-        length_width_ratio = length / width if width != 0 else 0
-
-        features_df = pd.DataFrame({
-            'Area': [area],
-            'Perimeter': [perimeter],
-            'Compactness': [compactness],
-            'Length': [length],
-            'Width': [width],
-            'AsymmetryCoeff': [asymmetry_coeff],
-            'Groove': [groove],
-            'Length_Width_Ratio': [length_width_ratio]
-        })
-
-        prediction = int(model.predict(features_df)[0])
-        return jsonify({"prediction": prediction})
+        features = parse_form(request.form)
+    except ValidationError as e:
+        outcomes['error'].inc()
+        return jsonify({"error": str(e), "fields": e.errors})
     except Exception as e:
+        outcomes['error'].inc()
         return jsonify({"error": str(e)})
+    return predict_features(features)
+
+# Lets main_app's /predict route requests with wheat form fields here
+dispatcher.register('wheat', WHEAT_SCHEMA.source_keys(), parse_form, predict_features,
+                    triggers=('area', 'perimeter', 'compactness', 'length', 'width'), priority=20)
 
-@wileen_app.before_request
-def check_model():
-    global model
-    if model is None:
-        model = load_model()
+@wileen_app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    if load_model() is None:
+        return jsonify({"error": "Model not loaded"})
+
+    # JSON by default; ?format=msgpack|arrow or the Accept header for bulk clients
+    try:
+        fmt = requested_format()
+    except UnsupportedFormat as e:
+        return unsupported_format_response(e)
+
+    try:
+        with batch_parse_timer.time():
+            features_df = build_features(read_batch_request())
+    except ValidationError as e:
+        return jsonify({"error": str(e), "fields": e.errors}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        with batch_predict_timer.time():
+            predictions = predict_frame(features_df)
+        outcomes['model'].inc(len(predictions))
+        return columns_response(fmt, {"predictions": predictions}, {"count": len(predictions)})
+    except Exception as e:
+        outcomes['error'].inc()
+        return jsonify({"error": str(e)})
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 10000))
-    print(f"Starting Flask app on port {port}")
+    log.info("startup", app="wheat", port=port)
     wileen_app.run(host='0.0.0.0', port=port, debug=False)
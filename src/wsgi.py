@@ -0,0 +1,23 @@
+import os
+import sys
+
+# Production entry point, used by gunicorn.conf.py. With preload_app the models
+# are loaded here once in the gunicorn master, before the workers fork.
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from main import main_app
+from model_registry import registry
+from roanne_carapp import get_encoding
+from native_model import compile_registered
+from structured_log import log
+
+app = main_app
+
+if os.environ.get("PRELOAD_MODELS", "1") == "1":
+    # Production wants the ML stack loaded up front, not on the first request
+    for name, state in registry.warm_up().items():
+        log.info("model_preloaded", model=name, state=state)
+    # After the car model, whose encoders supply the category vocabulary
+    get_encoding()
+    for name, engine in compile_registered(registry).items():
+        log.info("model_engine", model=name, engine=engine)
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The apps import each other as top-level modules from src/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+# Keep the structured log out of the test output, and load models from an
+# empty artifacts directory so every test decides which models exist
+os.environ.setdefault("LOG_FILE", os.devnull)
+os.environ["MODEL_ARTIFACTS_DIR"] = tempfile.mkdtemp(prefix="artifacts-")
+os.environ.pop("PREDICTION_CACHE_DB", None)
+
+SHIPPED_ARTIFACTS = os.path.join(ROOT, "artifacts")
+
+@pytest.fixture
+def client():
+    import main
+    return main.main_app.test_client()
+
+@pytest.fixture(autouse=True)
+def clear_prediction_cache():
+    from prediction_cache import prediction_cache
+    prediction_cache.clear()
+    yield
+    prediction_cache.clear()
@@ -0,0 +1,75 @@
+import json
+import os
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+import artifact_package
+from artifact_package import ArtifactError, load_package, pack
+
+FEATURES = ["a", "b", "c"]
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(50, 3))
+    return LinearRegression().fit(X, X @ [1.0, -2.0, 0.5] + 3.0)
+
+@pytest.fixture
+def package(tmp_path, model):
+    path = str(tmp_path / "model.pkg")
+    pack(model, path, features=FEATURES, source="model.pkl")
+    return path
+
+def flip_last_byte(path):
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+def edit_manifest(path, change):
+    with open(artifact_package.manifest_path(path)) as f:
+        manifest = json.load(f)
+    change(manifest)
+    with open(artifact_package.manifest_path(path), "w") as f:
+        json.dump(manifest, f)
+
+def test_pack_round_trip(package, model):
+    loaded = load_package(package)
+    X = np.random.default_rng(1).normal(size=(10, 3))
+    np.testing.assert_array_equal(loaded.predict(X), model.predict(X))
+    # The coefficients are views into the mapped arrays file, not copies
+    assert not loaded.coef_.flags.writeable
+
+    manifest = artifact_package.read_manifest(package)
+    assert manifest["features"] == {"names": FEATURES, "n_features": 3}
+    assert manifest["source"] == "model.pkl"
+    assert all(offset % artifact_package.ALIGNMENT == 0 for offset, _ in manifest["arrays"]["buffers"])
+
+def test_repacking_replaces_the_package(package):
+    refit = LinearRegression().fit(np.eye(3), [1.0, 2.0, 3.0])
+    pack(refit, package)
+    np.testing.assert_allclose(load_package(package).predict(np.eye(3)), [1.0, 2.0, 3.0])
+    assert os.listdir(os.path.dirname(package)) == ["model.pkg"]
+
+@pytest.mark.parametrize("filename", [artifact_package.MODEL_FILE, artifact_package.ARRAYS_FILE])
+def test_tampered_file_is_rejected(package, filename):
+    flip_last_byte(os.path.join(package, filename))
+    with pytest.raises(ArtifactError, match=f"{filename} does not match its sha256"):
+        load_package(package)
+
+def test_version_mismatch_is_rejected_before_unpickling(package, monkeypatch):
+    edit_manifest(package, lambda m: m["versions"].update(sklearn="0.0.1"))
+    monkeypatch.setattr(artifact_package.pickle, "loads", pytest.fail)
+    with pytest.raises(ArtifactError, match="packed with sklearn 0.0.1"):
+        load_package(package)
+
+def test_missing_library_is_rejected(package):
+    edit_manifest(package, lambda m: m["versions"].update(not_an_installed_library="1.0"))
+    with pytest.raises(ArtifactError, match="not installed"):
+        load_package(package)
+
+def test_unknown_format_is_rejected(package):
+    edit_manifest(package, lambda m: m.update(format=artifact_package.FORMAT_VERSION + 1))
+    with pytest.raises(ArtifactError, match="unsupported package format"):
+        load_package(package)
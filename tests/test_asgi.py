@@ -0,0 +1,75 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+import msgpack
+import numpy as np
+import pytest
+import asgi
+import main
+import roanne_carapp
+import wileenAPP
+from metrics import metrics
+from model_registry import registry
+
+def test_worker_init_turns_off_micro_batching():
+    # The batchers are built when main is imported, before the initializer runs
+    saved = roanne_carapp.batcher.max_batch_size, wileenAPP.batcher.max_batch_size
+    try:
+        asgi._init_worker()
+        assert roanne_carapp.batcher.max_batch_size == 1
+        assert wileenAPP.batcher.max_batch_size == 1
+    finally:
+        roanne_carapp.batcher.max_batch_size, wileenAPP.batcher.max_batch_size = saved
+
+def test_pool_backlog_is_exported():
+    text = metrics.render()
+    assert "asgi_pool_pending 0" in text
+    assert "asgi_pool_rejected_total 0" in text
+
+class ConstantClassifier:
+    def predict(self, X):
+        return np.full(len(X), 2, dtype=np.int64)
+
+@pytest.fixture
+def in_process_pool(monkeypatch):
+    # Run _dispatch on a thread instead of a worker process, against this
+    # process's app, so the test sees exactly what a pool worker is handed
+    monkeypatch.setattr(asgi, "_worker_app", main.main_app)
+    app = asgi.AsyncPredictionApp()
+    app.pool = ThreadPoolExecutor(max_workers=1)
+    registry.put("wheat", ConstantClassifier())
+    try:
+        yield app
+    finally:
+        registry.unload("wheat")
+        app.stop()
+
+def call(app, path, body, query_string=b"", headers=()):
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": query_string,
+             "headers": [(b"content-type", b"application/json")] + list(headers)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start, response = messages
+    return start["status"], dict(start["headers"]), response["body"]
+
+SAMPLES = json.dumps({"samples": [dict.fromkeys(wileenAPP.FORM_FIELDS, 1.0)] * 3}).encode()
+
+def test_pooled_request_keeps_its_query_string(in_process_pool):
+    status, headers, body = call(in_process_pool, "/wheat/predict_batch", SAMPLES,
+                                 query_string=b"format=msgpack")
+    assert status == 200
+    assert headers[b"content-type"] == b"application/msgpack"
+    assert list(msgpack.unpackb(body)["predictions"]) == [2, 2, 2]
+
+def test_pooled_request_keeps_its_accept_header(in_process_pool):
+    status, headers, body = call(in_process_pool, "/wheat/predict_batch", SAMPLES,
+                                 headers=[(b"accept", b"application/msgpack")])
+    assert status == 200
+    assert headers[b"content-type"] == b"application/msgpack"
@@ -0,0 +1,64 @@
+import io
+import json
+import pytest
+import responses
+import roanne_carapp
+from test_car_predict import CAR_FORM
+
+def ndjson(rows):
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(roanne_carapp, "BATCH_CHUNK_SIZE", 2)
+
+def post_batch(client, body, fmt):
+    return client.post(f"/car/predict_batch?format={fmt}", data=body,
+                       content_type="application/x-ndjson")
+
+def test_arrow_stream_is_complete(client, small_chunks):
+    pyarrow = pytest.importorskip("pyarrow")
+    response = post_batch(client, ndjson([CAR_FORM] * 3), "arrow")
+    table = pyarrow.ipc.open_stream(io.BytesIO(response.data)).read_all()
+    assert table.num_rows == 3
+    assert table.column("error").null_count == 3
+
+def test_arrow_failure_ends_with_an_error_record(client, small_chunks):
+    pyarrow = pytest.importorskip("pyarrow")
+    # The third line is only read after the first chunk has been sent
+    body = ndjson([CAR_FORM] * 2) + "{not json\n"
+    response = post_batch(client, body, "arrow")
+    # The stream is closed properly, and its last record says why it stopped
+    table = pyarrow.ipc.open_stream(io.BytesIO(response.data)).read_all()
+    assert table.num_rows == 3
+    errors = table.column("error").to_pylist()
+    assert errors[:2] == [None, None] and errors[2]
+
+def test_msgpack_failure_ends_with_an_error_record(client, small_chunks):
+    msgpack = pytest.importorskip("msgpack")
+    body = ndjson([CAR_FORM] * 2) + "{not json\n"
+    records = list(msgpack.Unpacker(io.BytesIO(post_batch(client, body, "msgpack").data)))
+    assert len(records) == 3
+    assert list(records[2]) == ["error"]
+
+def test_missing_library_gets_406(client, monkeypatch):
+    monkeypatch.setitem(responses.AVAILABLE, "arrow", False)
+    response = post_batch(client, ndjson([CAR_FORM]), "arrow")
+    assert response.status_code == 406
+    assert "arrow" not in response.get_json()["formats"]
+
+def post_csv(client, body):
+    return client.post("/car/predict_batch", data=body, content_type="text/csv")
+
+def test_csv_rows_are_validated_like_ndjson(client, small_chunks):
+    # Form field names or model column names; empty cells take the defaults
+    body = "year,Kilometers_Driven,seats\n2018,40000,\n2015,,7\n"
+    lines = [json.loads(line) for line in post_csv(client, body).data.splitlines()]
+    assert len(lines) == 2
+    assert all("error" not in line for line in lines)
+
+def test_bad_csv_cell_is_reported_with_its_row(client, small_chunks):
+    body = "year,kilometers_driven\n2018,40000\n2017,30000\n2016,lots\n"
+    lines = [json.loads(line) for line in post_csv(client, body).data.splitlines()]
+    assert len(lines) == 3
+    assert "row 2: Kilometers_Driven" in lines[2]["error"]
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+import bulk_score
+import roanne_carapp  # registers the car model
+from model_registry import registry
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+class YearModel:
+    # Prices every car at a tenth of its model year, so rows can be told apart
+    def predict(self, X):
+        return np.asarray(X)[:, 0] / 10.0
+
+INVENTORY = pd.DataFrame({
+    "brand_model": ["Honda City", "Toyota Innova", "Tata Nano", "Maruti Swift Dzire VDI", "Honda City"],
+    "year": [2011, 2013, 2015, 2017, 2019],
+    "kilometers_driven": [90000, 70000, 50000, 30000, 10000]
+})
+
+@pytest.fixture
+def car_model():
+    registry.put("car", YearModel())
+    yield
+    registry.unload("car")
+
+def write_input(df, path):
+    if path.suffix == ".csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_car_inventory_is_scored_in_input_order(tmp_path, car_model, suffix):
+    source, output = tmp_path / f"inventory{suffix}", tmp_path / "prices.parquet"
+    write_input(INVENTORY, source)
+
+    # Small batches, so the result is assembled from several row groups
+    rows = bulk_score.score_file("car", str(source), str(output), workers=0, batch_rows=2)
+    assert rows == len(INVENTORY)
+
+    result = pq.read_table(output).to_pandas()
+    assert list(result.columns) == list(INVENTORY.columns) + ["prediction", "note"]
+    assert result["year"].tolist() == INVENTORY["year"].tolist()
+    assert result["prediction"].tolist() == [201.1, 201.3, 201.5, 201.7, 201.9]
+    assert result["note"].isna().all()
+
+def test_wheat_samples_are_classified(tmp_path):
+    import wileenAPP
+
+    class ConstantClassifier:
+        def predict(self, X):
+            return np.full(len(X), 3, dtype=np.int64)
+
+    samples = pd.DataFrame({column: np.linspace(1.0, 2.0, 4) for column in wileenAPP.FEATURE_COLUMNS})
+    source, output = tmp_path / "samples.csv", tmp_path / "classes.parquet"
+    samples.to_csv(source, index=False)
+    registry.put("wheat", ConstantClassifier())
+    try:
+        assert bulk_score.score_file("wheat", str(source), str(output), workers=0) == 4
+    finally:
+        registry.unload("wheat")
+    assert pq.read_table(output).column("prediction").to_pylist() == [3, 3, 3, 3]
+
+def test_worker_pool_matches_in_process_scoring(tmp_path):
+    # The workers load the model themselves; the test artifacts directory is
+    # empty, so both sides price with the stand-in model
+    source = tmp_path / "inventory.parquet"
+    write_input(INVENTORY, source)
+    bulk_score.score_file("car", str(source), str(tmp_path / "pool.parquet"), workers=2, batch_rows=2)
+    bulk_score.score_file("car", str(source), str(tmp_path / "local.parquet"), workers=0, batch_rows=2)
+    registry.unload("car")
+    assert pq.read_table(tmp_path / "pool.parquet").equals(pq.read_table(tmp_path / "local.parquet"))
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import roanne_carapp
+from roanne_carapp import CAR_SCHEMA, categorical_columns, numerical_columns
+from test_car_predict import CAR_FORM
+
+def sklearn_row(encoding, user_input):
+    # What the lookup tables replace: one OneHotEncoder.transform per column
+    blocks = [encoding.encoders[col].transform(pd.DataFrame({col: [user_input[col]]}))
+              for col in categorical_columns]
+    numbers = np.array([[user_input[col] for col in numerical_columns]], dtype=np.float64)
+    return np.hstack([numbers] + blocks)
+
+def inputs(encoding):
+    base = CAR_SCHEMA.validate(CAR_FORM)
+    # Every known category of every column, then values no encoder has seen
+    for col in categorical_columns:
+        for value in encoding.vocabulary[col]:
+            yield dict(base, **{col: value})
+    yield dict(base, Brand_Model="Hindustan Ambassador", Location="Atlantis")
+    yield dict(base, **{col: "" for col in categorical_columns})
+
+def test_lookup_tables_match_one_hot_encoder():
+    encoding = roanne_carapp.get_encoding()
+    for user_input in inputs(encoding):
+        expected = sklearn_row(encoding, user_input)
+        np.testing.assert_array_equal(roanne_carapp.encode_input(user_input), expected)
+
+def test_feature_names_match_the_encoders():
+    encoding = roanne_carapp.get_encoding()
+    names = [name for col in categorical_columns for name in encoding.encoders[col].get_feature_names_out([col])]
+    assert encoding.feature_names == numerical_columns + names
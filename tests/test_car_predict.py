@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import roanne_carapp
+from model_registry import registry
+from prediction_cache import prediction_cache
+
+CAR_FORM = {
+    "brand_model": "Maruti Swift Dzire VDI", "location": "Mumbai", "year": "2018",
+    "kilometers_driven": "40000", "fuel_type": "Petrol", "transmission": "Manual",
+    "owner_type": "First", "mileage": "20", "engine": "1200", "power": "80", "seats": "5"
+}
+
+class FlakyModel:
+    # Fails its first predict call, then prices every car at 7.5
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("transient failure")
+        return np.full(len(X), 7.5)
+
+@pytest.fixture
+def restore_car_model():
+    yield
+    registry.unload("car")
+
+def cached_keys():
+    return list(prediction_cache._entries)
+
+def test_fallback_price_is_not_cached(client, restore_car_model):
+    registry.put("car", FlakyModel())
+    first = client.post("/car/predict", data=CAR_FORM).get_json()
+    assert first["note"] == "Using fallback prediction"
+    assert cached_keys() == []
+
+    # The same input is scored by the model once it recovers
+    second = client.post("/car/predict", data=CAR_FORM).get_json()
+    assert second == {"Predicted Price (INR Lakhs)": 7.5}
+    assert len(cached_keys()) == 1
+
+def test_cache_key_uses_the_loaded_models_fingerprint(client, restore_car_model):
+    # Nothing loaded yet: the request loads the model before building its key
+    registry.unload("car")
+    assert not registry.is_loaded("car")
+    client.post("/car/predict", data=CAR_FORM)
+    (key,) = cached_keys()
+    assert key[1] is not None
+    assert key[1] == registry.fingerprint("car")
+
+def test_single_and_batch_fallback_prices_agree(client, restore_car_model):
+    registry.put("car", FlakyModel())
+    single = client.post("/car/predict", data=CAR_FORM).get_json()
+    assert single["note"] == "Using fallback prediction"
+    # 15 + (2018 - 2010) * 0.5 - 40000 / 10000 * 0.2
+    assert single["Predicted Price (INR Lakhs)"] == 18.2
+
+    batch = roanne_carapp.fallback_price(np.array([2018]), np.array([40000]))
+    assert round(float(batch[0]), 2) == single["Predicted Price (INR Lakhs)"]
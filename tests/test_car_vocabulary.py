@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+import roanne_carapp
+from model_registry import registry
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+import build_car_vocabulary
+
+TRAINING = pd.DataFrame({
+    "Brand_Model": ["Tata Nano", "Mahindra XUV500", "Tata Nano", "Maruti Alto"],
+    "Location": ["Pune", "Jaipur", "Pune", "Pune"],
+    "Fuel_Type": ["Petrol", "Diesel", "Petrol", "CNG"],
+    "Transmission": ["Manual", "Manual", "Automatic", "Manual"],
+    "Owner_Type": ["First", "Second", "First", "First"],
+    "Year": [2012, 2016, 2011, 2015]
+})
+
+def encoded_model():
+    # A car model that one-hot encodes its categoricals itself
+    prepare = ColumnTransformer([("categories", OneHotEncoder(handle_unknown="ignore"),
+                                  roanne_carapp.categorical_columns)], remainder="passthrough")
+    return Pipeline([("prepare", prepare), ("model", LinearRegression())]).fit(TRAINING, [2.0, 9.0, 2.5, 3.0])
+
+@pytest.fixture
+def vocabulary_file():
+    path = os.path.join(registry.artifacts_dir, roanne_carapp.VOCABULARY_FILE)
+    yield path
+    if os.path.exists(path):
+        os.remove(path)
+
+@pytest.fixture
+def car_model():
+    model = encoded_model()
+    registry.put("car", model)
+    yield model
+    registry.unload("car")
+
+def suggest(client, field, q=""):
+    return client.get(f"/car/suggest?field={field}&q={q}").get_json()["suggestions"]
+
+def test_vocabulary_comes_from_the_models_encoders(client, car_model):
+    assert roanne_carapp.model_categories(car_model)["Location"] == ["Jaipur", "Pune"]
+    # Only values the loaded model was trained on are suggested
+    assert sorted(suggest(client, "location")) == ["Jaipur", "Pune"]
+    assert suggest(client, "brand_model", "ta") == ["Tata Nano"]
+
+def test_vocabulary_follows_a_model_swap(client, car_model):
+    assert "Mumbai" not in suggest(client, "location")
+    registry.unload("car")
+    # Without encoders in the model, the built-in common values are used
+    assert "Mumbai" in suggest(client, "location")
+
+def test_suggestions_are_revalidated_against_the_vocabulary(client, car_model):
+    response = client.get("/car/suggest?field=location")
+    etag, _ = response.get_etag()
+    assert response.headers["Cache-Control"] == "public, no-cache"
+
+    unchanged = client.get("/car/suggest?field=location", headers={"If-None-Match": f'"{etag}"'})
+    assert unchanged.status_code == 304 and unchanged.data == b""
+
+    # A model swap changes the vocabulary, so the old tag no longer matches
+    registry.unload("car")
+    changed = client.get("/car/suggest?field=location", headers={"If-None-Match": f'"{etag}"'})
+    assert changed.status_code == 200
+    assert "Mumbai" in changed.get_json()["suggestions"]
+    assert changed.get_etag()[0] != etag
+
+def test_shipped_ranking_orders_the_models_values(client, car_model, vocabulary_file, tmp_path):
+    csv = tmp_path / "training.csv"
+    TRAINING.to_csv(csv, index=False)
+    vocabulary = build_car_vocabulary.build(str(csv))
+    assert vocabulary["Location"] == ["Pune", "Jaipur"]
+    assert vocabulary["Brand_Model"] == ["Tata Nano", "Mahindra XUV500", "Maruti Alto"]
+
+    vocabulary["Location"].append("Atlantis")
+    with open(vocabulary_file, "w") as f:
+        json.dump(vocabulary, f)
+    registry.put("car", encoded_model())
+    # Most common first; values the model doesn't know are left out
+    assert suggest(client, "location") == ["Pune", "Jaipur"]
@@ -0,0 +1,33 @@
+import main
+from dispatch import Dispatcher, dispatcher
+
+WHEAT_FIELDS = {"area": "15.26", "perimeter": "14.84", "compactness": "0.871", "length": "5.763",
+                "width": "3.312", "asymmetry_coeff": "2.221", "groove": "5.22"}
+
+def test_mixed_form_goes_to_car():
+    # Wheat registers first (main imports it first); car still wins, as it always has
+    assert list(dispatcher.routes)[0] == "wheat"
+    route = dispatcher.resolve(list(WHEAT_FIELDS) + ["year", "seats"])
+    assert route.name == "car"
+
+def test_only_trigger_fields_select_a_model():
+    assert dispatcher.resolve(["mileage", "seats"]) is None
+    assert dispatcher.resolve(["groove", "asymmetry_coeff"]) is None
+    assert dispatcher.resolve(["kilometers_driven"]).name == "car"
+    assert dispatcher.resolve(["groove", "width"]).name == "wheat"
+
+def test_priority_beats_registration_order():
+    routes = Dispatcher()
+    routes.register("late", ["x"], None, None, priority=50)
+    routes.register("early", ["x", "y"], None, None, triggers=["x"], priority=5)
+    routes.register("plugin", ["x"], None, None)
+    assert routes.resolve(["x"]).name == "early"
+    assert routes.resolve(["y"]) is None
+
+def test_mixed_form_is_priced_as_a_car(client):
+    form = dict(WHEAT_FIELDS, brand_model="Maruti Swift Dzire VDI", year="2018",
+                kilometers_driven="40000", location="Mumbai", fuel_type="Petrol",
+                transmission="Manual", owner_type="First", mileage="20", engine="1200",
+                power="80", seats="5")
+    body = client.post("/predict", data=form).get_json()
+    assert "Predicted Price (INR Lakhs)" in body
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+import app as housing_app
+from app import HousingScorer, HOUSING_SCHEMA, expected_columns, numeric_columns
+from model_registry import registry
+
+HOUSES = [
+    {"Suburb": "Abbotsford", "Rooms": 2, "Type": "h", "Distance": 2.5, "Landsize": 202,
+     "BuildingArea": 80, "YearBuilt": 1900, "Latitude": -37.80, "Longitude": 144.99},
+    {"Suburb": "Richmond", "Rooms": 3, "Type": "u", "Distance": 3.0, "Landsize": 0,
+     "BuildingArea": 120, "YearBuilt": 1970, "Latitude": -37.82, "Longitude": 145.00},
+    {"Suburb": "Kew", "Rooms": 4, "Type": "h", "Distance": 5.6, "Landsize": 650,
+     "BuildingArea": 210, "YearBuilt": 1935, "Latitude": -37.80, "Longitude": 145.03},
+]
+
+def housing_pipeline():
+    # Same shape as what PyCaret's load_model returns: a fitted Pipeline whose
+    # preprocessing selects columns by name, followed by the regressor
+    text_columns = [c for c in expected_columns if c not in numeric_columns]
+    rows = HOUSING_SCHEMA.validate_batch(HOUSES * 4)
+    frame = pd.DataFrame(rows, columns=expected_columns)
+    prices = np.linspace(0.5, 2.5, len(frame)) * 1e6
+    pipeline = Pipeline([
+        ("prepare", ColumnTransformer([
+            ("numeric", SimpleImputer(strategy="mean"), numeric_columns),
+            ("text", OneHotEncoder(handle_unknown="ignore"), text_columns)
+        ])),
+        ("trained_model", Ridge(alpha=1.0))
+    ])
+    return pipeline.fit(frame, prices)
+
+def reference(pipeline, rows):
+    # What the pipeline gives for a freshly built frame
+    frame = pd.DataFrame(rows, columns=expected_columns)
+    return np.round(pipeline.predict(frame), 4).tolist()
+
+@pytest.fixture
+def housing_model():
+    pipeline = housing_pipeline()
+    registry.put("housing", pipeline)
+    yield pipeline
+    registry.unload("housing")
+
+def test_single_rows_match_a_fresh_frame(housing_model):
+    scorer = HousingScorer(housing_model)
+    assert scorer.pipeline is housing_model
+    rows = HOUSING_SCHEMA.validate_batch(HOUSES)
+    # The per-thread frame is reused, so each row must fully replace the last
+    for row in rows + rows[::-1]:
+        assert scorer.predict([row]) == reference(housing_model, [row])
+    assert list(scorer._row_frame().dtypes) == list(scorer._template.dtypes)
+
+def test_batch_matches_a_fresh_frame(housing_model):
+    rows = HOUSING_SCHEMA.validate_batch(HOUSES)
+    assert HousingScorer(housing_model).predict(rows) == reference(housing_model, rows)
+
+def test_wrapped_pipeline_is_found(housing_model):
+    class Wrapper:
+        pipeline = housing_model
+    assert HousingScorer(Wrapper()).pipeline is housing_model
+
+def test_predict_route_uses_the_fast_path(housing_model, monkeypatch):
+    def no_predict_model(self, rows):
+        raise AssertionError("predict_model should not be called")
+    monkeypatch.setattr(HousingScorer, "predict_model", no_predict_model)
+    client = housing_app.app.test_client()
+    rows = HOUSING_SCHEMA.validate_batch(HOUSES)
+
+    single = client.post("/predict", json=HOUSES[0]).get_json()
+    assert single == {"prediction": reference(housing_model, rows[:1])}
+    batch = client.post("/predict", json=HOUSES).get_json()
+    assert batch == {"prediction": reference(housing_model, rows)}
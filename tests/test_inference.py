@@ -0,0 +1,24 @@
+import gc
+import weakref
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from inference import needs_column_names
+
+def fitted(X):
+    return LinearRegression().fit(X, np.arange(len(X), dtype=float))
+
+def test_array_fitted_model_takes_numpy():
+    assert needs_column_names(fitted(np.random.rand(10, 3))) is False
+
+def test_frame_fitted_model_needs_names():
+    X = pd.DataFrame(np.random.rand(10, 3), columns=["a", "b", "c"])
+    assert needs_column_names(fitted(X)) is True
+
+def test_decision_does_not_keep_retired_models_alive():
+    model = fitted(np.random.rand(10, 3))
+    needs_column_names(model)
+    ref = weakref.ref(model)
+    del model
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,60 @@
+import threading
+import time
+from micro_batcher import MicroBatcher
+
+def run_concurrently(batcher, rows, first_running):
+    # The first row is scored alone; the rest arrive while it runs and are
+    # queued up for the next batch
+    results = {}
+
+    def submit(row):
+        try:
+            results[row] = ("ok", batcher.submit(row))
+        except Exception as e:
+            results[row] = ("error", str(e))
+
+    threads = [threading.Thread(target=submit, args=(row,)) for row in rows]
+    threads[0].start()
+    assert first_running.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_rows_are_scored_together():
+    calls = []
+    running = threading.Event()
+
+    def predict(rows):
+        calls.append(len(rows))
+        running.set()
+        time.sleep(0.05)
+        return [row * 2 for row in rows]
+
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=200)
+    results = run_concurrently(batcher, [1, 2, 3, 4, 5], running)
+    assert results == {row: ("ok", row * 2) for row in [1, 2, 3, 4, 5]}
+    assert calls == [1, 4]
+
+def test_bad_row_only_fails_its_own_caller():
+    running = threading.Event()
+
+    def predict(rows):
+        running.set()
+        time.sleep(0.05)
+        if "bad" in rows:
+            raise ValueError("cannot score bad")
+        return [f"price:{row}" for row in rows]
+
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=200)
+    results = run_concurrently(batcher, ["first", "a", "b", "bad", "c"], running)
+    assert results["bad"] == ("error", "cannot score bad")
+    assert {row: results[row] for row in "abc"} == {row: ("ok", f"price:{row}") for row in "abc"}
+    assert batcher.split_batches == 1
+
+def test_lone_caller_does_not_wait_for_a_batch():
+    batcher = MicroBatcher(lambda rows: [row * 2 for row in rows], max_batch_size=4, max_wait_ms=1000)
+    started = time.monotonic()
+    assert batcher.submit(21) == 42
+    assert time.monotonic() - started < 0.5
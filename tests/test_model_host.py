@@ -0,0 +1,38 @@
+import os
+import pytest
+import model_host
+from model_registry import registry
+
+@pytest.fixture
+def count_scans(monkeypatch):
+    scans = []
+    discover = model_host.discover
+
+    def counting_discover():
+        scans.append(1)
+        return discover()
+
+    monkeypatch.setattr(model_host, "discover", counting_discover)
+    return scans
+
+def test_unknown_names_do_not_rescan(client, count_scans):
+    model_host.discover()
+    count_scans.clear()
+    for _ in range(3):
+        response = client.post("/models/no_such_model/predict", json=[[1.0]])
+        assert response.status_code == 404
+    assert count_scans == []
+
+def test_new_artifact_is_found(count_scans):
+    model_host.discover()
+    count_scans.clear()
+    assert model_host.resolve("late_model") is None
+    assert count_scans == []
+    path = os.path.join(registry.artifacts_dir, "late_model.pkl")
+    try:
+        open(path, "wb").close()
+        # Creating the file changed the directory, so the miss rescans once
+        assert model_host.resolve("late_model") == "late_model"
+        assert len(count_scans) == 1
+    finally:
+        os.remove(path)
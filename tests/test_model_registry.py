@@ -0,0 +1,118 @@
+import os
+import pickle
+import time
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+import model_registry
+from model_registry import ModelRegistry
+
+X = np.arange(12, dtype=np.float64).reshape(6, 2)
+
+def fitted(slope):
+    return LinearRegression().fit(X, X @ np.array([slope, 1.0]))
+
+def sample():
+    return X[:1]
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(artifacts_dir=str(tmp_path))
+
+def write(path, model, age=0):
+    # age: seconds to push the mtime back, so a rewrite always changes the signature
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+class NoPredict:
+    pass
+
+def test_in_place_overwrite_keeps_the_loaded_model_working(registry, tmp_path):
+    path = tmp_path / "linear.joblib"
+    joblib.dump(fitted(2.0), path)
+    registry.register("linear", ["linear.joblib"], sample=sample)
+    model = registry.get("linear")
+    assert isinstance(model.coef_, np.memmap)
+    expected = model.predict(X)
+
+    # cp-style overwrite: same file, truncated and rewritten
+    new_bytes = (tmp_path / "new.joblib")
+    joblib.dump(fitted(5.0), new_bytes)
+    with open(path, "r+b") as f:
+        f.truncate(0)
+        f.write(new_bytes.read_bytes())
+        os.fsync(f.fileno())
+
+    # The old model still answers, then the reload swaps in the new one
+    assert np.array_equal(model.predict(X), expected)
+    assert registry.reload("linear")
+    assert not np.array_equal(registry.get("linear").predict(X), expected)
+
+def test_missing_artifact_backs_off_before_looking_again(registry, tmp_path, monkeypatch):
+    registry.register("linear", ["linear.pkl"])
+    lookups = []
+    resolve_path = registry.resolve_path
+    monkeypatch.setattr(registry, "resolve_path", lambda name: lookups.append(name) or resolve_path(name))
+
+    assert registry.get("linear") is None
+    assert registry.get("linear") is None
+    assert len(lookups) == 1
+    entry = registry._entries["linear"]
+    assert entry.failures == 1
+    assert entry.next_attempt - time.monotonic() == pytest.approx(model_registry.RETRY_BASE_SECONDS, abs=0.5)
+
+    # Once the delay is over the artifact is looked for again and loaded
+    write(tmp_path / "linear.pkl", fitted(2.0))
+    entry.next_attempt = 0.0
+    assert registry.get("linear") is not None
+    assert (entry.failures, entry.next_attempt) == (0, 0.0)
+
+def test_retry_delay_doubles_up_to_the_maximum(registry):
+    entry = registry.register("linear", ["linear.pkl"])
+    delays = []
+    for _ in range(10):
+        registry._schedule_retry(entry)
+        delays.append(round(entry.next_attempt - time.monotonic()))
+    assert delays[:4] == [1, 2, 4, 8]
+    assert delays[-1] == model_registry.RETRY_MAX_SECONDS
+
+def test_reload_swaps_in_a_changed_artifact(registry, tmp_path):
+    path = tmp_path / "linear.pkl"
+    write(path, fitted(2.0), age=10)
+    registry.register("linear", ["linear.pkl"], sample=sample)
+    old = registry.get("linear")
+    old_fingerprint = registry.fingerprint("linear")
+    assert not registry.reload("linear")
+
+    write(path, fitted(5.0))
+    assert registry.reload("linear")
+    assert registry.get("linear") is not old
+    assert registry.fingerprint("linear") != old_fingerprint
+    assert registry.status()["linear"]["reloads"] == 1
+
+def test_rejected_reload_keeps_the_live_model(registry, tmp_path):
+    path = tmp_path / "linear.pkl"
+    write(path, fitted(2.0), age=10)
+    registry.register("linear", ["linear.pkl"], sample=sample)
+    live = registry.get("linear")
+
+    write(path, NoPredict(), age=5)
+    assert not registry.reload("linear")
+    assert registry.get("linear") is live
+    status = registry.status()["linear"]
+    assert "no predict method" in status["error"]
+    assert status["failures"] == 1
+
+    # The bad file is not tried again, even once the backoff is over...
+    registry._entries["linear"].next_attempt = 0.0
+    assert not registry.reload("linear")
+    assert registry.status()["linear"]["failures"] == 1
+
+    # ...but a fixed one is, and clears the failure
+    write(path, fitted(5.0))
+    assert registry.reload("linear")
+    status = registry.status()["linear"]
+    assert (status["error"], status["failures"]) == (None, 0)
@@ -0,0 +1,156 @@
+import gc
+import os
+import weakref
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge, RidgeClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+import native_model
+from native_model import NativeModel, Unsupported, compile_model
+from wileenAPP import FEATURE_COLUMNS
+from conftest import SHIPPED_ARTIFACTS
+
+# Stand-ins with the same attributes and predict semantics as PyCaret 3.3's
+# TransformerWrapper, TransformerWrapperWithInverse and Pipeline, which are
+# what seed_pipeline.pkl is made of. PyCaret itself isn't installed here.
+
+class TransformerWrapper(BaseEstimator, TransformerMixin):
+    def __init__(self, transformer, include=None, exclude=None):
+        self.transformer = transformer
+        self.include = include
+        self.exclude = exclude
+        self._train_only = getattr(transformer, "_train_only", False)
+        self._include = include
+        self._exclude = exclude or []
+        self._feature_names_in = None
+
+    def fit(self, X, y=None):
+        self.target_name_ = getattr(y, "name", None)
+        self._feature_names_in = list(X.columns) + ([y.name] if y is not None else [])
+        if self._include is None:
+            self._include = [c for c in X.columns if c not in self._exclude]
+        if self._include:
+            self.transformer.fit(X[self._include])
+        return self
+
+    def transform(self, X):
+        if not self._include:
+            return X
+        X = X.copy()
+        X[self._include] = self.transformer.transform(X[self._include])
+        return X
+
+class TransformerWrapperWithInverse(TransformerWrapper):
+    def fit(self, X, y=None):
+        self.target_name_ = y.name
+        self._feature_names_in = list(X.columns) + [y.name]
+        self.transformer.fit(y)
+        return self
+
+    def transform(self, X):
+        return X
+
+    def inverse_transform(self, y):
+        return pd.Series(self.transformer.inverse_transform(y), name=self.target_name_)
+
+class RemoveOutliers(BaseEstimator, TransformerMixin):
+    _train_only = True
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        raise AssertionError("train-only step used for prediction")
+
+class PycaretPipeline(Pipeline):
+    def predict(self, X):
+        for _, step in self.steps[:-1]:
+            if not getattr(step, "_train_only", False):
+                X = step.transform(X)
+        y = self.steps[-1][1].predict(X)
+        for _, step in reversed(self.steps[:-1]):
+            if hasattr(step, "inverse_transform"):
+                y = step.inverse_transform(y)
+        return y
+
+def seed_like_pipeline(normalize_include=None):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(10, 3, (60, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    X.iloc[::7, 2] = np.nan
+    y = pd.Series(np.repeat([1, 2, 3], 20), name="Type")
+
+    label_encoding = TransformerWrapperWithInverse(LabelEncoder()).fit(X, y)
+    encoded = pd.Series(label_encoding.transformer.transform(y), name="Type")
+    steps = [
+        ("label_encoding", label_encoding),
+        ("numerical_imputer", TransformerWrapper(SimpleImputer(strategy="mean"), include=FEATURE_COLUMNS)),
+        ("categorical_imputer", TransformerWrapper(SimpleImputer(strategy="most_frequent"), include=[])),
+        ("remove_outliers", TransformerWrapper(RemoveOutliers())),
+        ("normalize", TransformerWrapper(StandardScaler(), include=normalize_include))
+    ]
+    Xt = X
+    for _, step in steps[1:]:
+        step.fit(Xt, encoded)
+        if not step._train_only:
+            Xt = step.transform(Xt)
+    model = RidgeClassifier().fit(Xt, encoded)
+    return PycaretPipeline(steps + [("trained_model", model)]), X
+
+@pytest.mark.parametrize("normalize_include", [None, ["Area", "Length", "Groove"]])
+def test_pycaret_pipeline_is_unwrapped(normalize_include):
+    pipeline, X = seed_like_pipeline(normalize_include)
+    native = compile_model(pipeline)
+    # Imputer and scaler kept; label encoding, empty and train-only steps dropped
+    assert len(native.transforms) == 2
+    assert native.columns == FEATURE_COLUMNS
+
+    expected = np.asarray(pipeline.predict(X))
+    assert set(expected) == {1, 2, 3}
+    assert np.array_equal(native.predict(X.to_numpy()), expected)
+    assert native_model._matches(native, pipeline, X.iloc[:1])
+
+def test_partial_columns_leave_the_rest_alone():
+    pipeline, X = seed_like_pipeline(["Area"])
+    native = compile_model(pipeline)
+    rows = np.ascontiguousarray(X.fillna(0).to_numpy()[:3])
+    before = rows.copy()
+    native.predict(rows)
+    assert np.array_equal(rows, before)
+
+def test_bulk_fallback_gets_column_names():
+    pipeline, X = seed_like_pipeline()
+    native = compile_model(pipeline)
+    native.max_rows = 5
+    assert np.array_equal(native.predict(X.to_numpy()), np.asarray(pipeline.predict(X)))
+
+def test_compiled_form_does_not_keep_a_retired_model_alive():
+    X = np.random.default_rng(0).normal(size=(30, 3))
+    model = Pipeline([("scale", StandardScaler()), ("ridge", Ridge())]).fit(X, X.sum(axis=1))
+    native = native_model.compiled(model, lambda: X[:1])
+    assert isinstance(native, NativeModel)
+    assert native_model.compiled(model) is native
+
+    # What a hot reload does: the registry lets go of the old model
+    retired = weakref.ref(model)
+    del model
+    gc.collect()
+    assert retired() is None
+
+def test_lightgbm_is_left_to_lightgbm():
+    lightgbm = pytest.importorskip("lightgbm")
+    model = lightgbm.LGBMRegressor(n_estimators=2).fit(np.random.rand(20, 3), np.random.rand(20))
+    with pytest.raises(Unsupported, match="LightGBM"):
+        compile_model(model)
+
+def test_shipped_seed_pipeline_compiles():
+    pytest.importorskip("pycaret")
+    import joblib
+    from wileenAPP import sample_input
+    pipeline = joblib.load(os.path.join(SHIPPED_ARTIFACTS, "seed_pipeline.pkl"))
+    native = native_model.compiled(pipeline, sample_input)
+    assert isinstance(native, NativeModel)
@@ -0,0 +1,26 @@
+import json
+import time
+import numpy as np
+from model_registry import registry
+from metrics import request_seconds
+
+class SlowModel:
+    def predict(self, X):
+        time.sleep(0.2)
+        return np.full(len(X), 5.0)
+
+def total_seconds(endpoint):
+    return request_seconds.labels(endpoint=endpoint).sum
+
+def test_streamed_batch_is_timed_until_the_stream_ends(client):
+    registry.put("car", SlowModel())
+    try:
+        rows = "\n".join(json.dumps({"year": 2015, "kilometers_driven": 50000}) for _ in range(3))
+        before = total_seconds("car_predict_batch")
+        response = client.post("/car/predict_batch", data=rows, content_type="application/x-ndjson")
+        # The model runs while the body is consumed, after after_request has returned
+        assert len(response.get_data().splitlines()) == 3
+        response.close()
+        assert total_seconds("car_predict_batch") - before >= 0.2
+    finally:
+        registry.unload("car")
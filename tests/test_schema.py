@@ -0,0 +1,49 @@
+import pytest
+from schema import Field, Schema, ValidationError
+
+SCHEMA = Schema([
+    Field("Year", int, source="year"),
+    Field("Price", float, default=0.0, source="price"),
+    Field("Seats", int, default=5, source="seats", lenient=True),
+    Field("Fuel", str, default="Petrol")
+])
+
+def test_values_are_coerced_to_the_field_type():
+    values = SCHEMA.validate({"year": " 2018 ", "price": "7.25", "seats": 4.0, "Fuel": "Diesel"})
+    assert values == {"Year": 2018, "Price": 7.25, "Seats": 4, "Fuel": "Diesel"}
+    assert type(values["Year"]) is int and type(values["Price"]) is float
+
+def test_whole_number_strings_are_ints_and_fractions_are_not():
+    assert SCHEMA.validate({"year": "2018.0"})["Year"] == 2018
+    with pytest.raises(ValidationError) as e:
+        SCHEMA.validate({"year": "2018.5"})
+    assert e.value.errors == {"Year": "expected int, got '2018.5'"}
+
+def test_missing_and_empty_values_take_the_default():
+    values = SCHEMA.validate({"year": 2020, "price": "", "seats": None})
+    assert values == {"Year": 2020, "Price": 0.0, "Seats": 5, "Fuel": "Petrol"}
+
+def test_lenient_field_falls_back_instead_of_failing():
+    assert SCHEMA.validate({"year": 2020, "seats": "many"})["Seats"] == 5
+
+def test_every_field_error_is_reported_at_once():
+    with pytest.raises(ValidationError) as e:
+        SCHEMA.validate({"price": "cheap"})
+    assert e.value.errors == {"Year": "required", "Price": "expected float, got 'cheap'"}
+
+def test_source_key_and_column_name_are_both_accepted():
+    # The source key wins when a payload carries both
+    assert SCHEMA.validate({"Year": 2015})["Year"] == 2015
+    assert SCHEMA.validate({"year": 2016, "Year": 2015})["Year"] == 2016
+    assert SCHEMA.source_keys() == ["year", "price", "seats", "Fuel"]
+
+def test_batch_errors_are_collected_across_rows():
+    rows = [{"year": 2018}, {"year": "old"}, "not a row", {"price": "x"}]
+    with pytest.raises(ValidationError) as e:
+        SCHEMA.validate_batch(rows, start=10)
+    assert e.value.errors == {
+        "row 11: Year": "expected int, got 'old'",
+        "row 12": "expected an object",
+        "row 13: Year": "required",
+        "row 13: Price": "expected float, got 'x'"
+    }
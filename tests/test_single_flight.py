@@ -0,0 +1,66 @@
+import threading
+import time
+from single_flight import SingleFlight
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+def run_with_followers(flight, fn, shareable=None, followers=3):
+    # The leader blocks until every follower is waiting on it
+    release = threading.Event()
+    results = {}
+
+    def leader_fn():
+        release.wait(5)
+        return fn("leader")
+
+    def run(name, work):
+        try:
+            results[name] = ("ok",) + flight.do("key", work, shareable)
+        except Exception as e:
+            results[name] = ("error", str(e))
+
+    leader = threading.Thread(target=run, args=("leader", leader_fn))
+    leader.start()
+    wait_until(lambda: flight.in_flight() == 1)
+    threads = [threading.Thread(target=run, args=(f"f{i}", lambda i=i: fn(f"f{i}"))) for i in range(followers)]
+    for thread in threads:
+        thread.start()
+    try:
+        wait_until(lambda: flight.followers == followers)
+    finally:
+        release.set()
+    for thread in [leader] + threads:
+        thread.join()
+    return results
+
+def test_followers_share_a_good_result():
+    flight = SingleFlight("test")
+    results = run_with_followers(flight, lambda who: f"price from {who}")
+    assert {r for name, r in results.items() if name != "leader"} == {("ok", "price from leader", True)}
+    assert flight.retries == 0
+
+def test_failed_leader_does_not_fail_its_followers():
+    def fn(who):
+        if who == "leader":
+            raise RuntimeError("transient failure")
+        return f"price from {who}"
+
+    flight = SingleFlight("test")
+    results = run_with_followers(flight, fn)
+    assert results["leader"] == ("error", "transient failure")
+    for name in ("f0", "f1", "f2"):
+        assert results[name] == ("ok", f"price from {name}", False)
+    assert flight.retries == 3
+
+def test_fallback_result_is_not_shared():
+    def fn(who):
+        return {"price": 1.0, "note": "fallback"} if who == "leader" else {"price": 7.5}
+
+    flight = SingleFlight("test")
+    results = run_with_followers(flight, fn, shareable=lambda result: "note" not in result)
+    assert results["leader"] == ("ok", {"price": 1.0, "note": "fallback"}, False)
+    assert all(results[f"f{i}"] == ("ok", {"price": 7.5}, False) for i in range(3))
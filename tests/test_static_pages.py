@@ -0,0 +1,51 @@
+import gzip
+import pytest
+
+def get(client, accept_encoding=None, **headers):
+    if accept_encoding is not None:
+        headers["Accept-Encoding"] = accept_encoding
+    return client.get("/", headers={k.replace("_", "-"): v for k, v in headers.items()})
+
+@pytest.fixture
+def html(client):
+    return get(client, "identity").data
+
+def test_gzip_when_accepted(client, html):
+    response = get(client, "gzip, deflate")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.data) == html
+
+@pytest.mark.parametrize("accept_encoding", [None, "", "deflate", "gzip;q=0", "gzip;q=0.5, identity"])
+def test_identity_when_preferred_or_nothing_else_fits(client, accept_encoding):
+    response = get(client, accept_encoding)
+    assert "Content-Encoding" not in response.headers
+    assert response.data.lstrip().lower().startswith(b"<!doctype")
+
+def test_refused_identity_is_still_served_compressed(client):
+    assert get(client, "gzip, identity;q=0").headers["Content-Encoding"] == "gzip"
+
+@pytest.mark.parametrize("accept_encoding", ["identity;q=0", "*;q=0", "deflate, *;q=0"])
+def test_refusing_every_encoding_gets_406(client, accept_encoding):
+    response = get(client, accept_encoding)
+    assert response.status_code == 406
+    assert b"gzip" in response.data
+
+def test_current_etag_gets_304(client):
+    etag = get(client, "gzip").headers["ETag"]
+    response = get(client, "gzip", If_None_Match=etag)
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+def test_any_encodings_etag_means_current(client):
+    # A client that switched encodings still has the current HTML
+    etag = get(client, "identity").headers["ETag"]
+    response = get(client, "gzip", If_None_Match=etag)
+    assert response.status_code == 304
+    assert response.headers["ETag"] != etag
+
+def test_stale_etag_gets_the_page(client, html):
+    response = get(client, "identity", If_None_Match='"stale"')
+    assert response.status_code == 200
+    assert response.data == html